@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Analytics rollups: items per decade, location and key person, per field, kept current on ingest"""
+
+import re
+import json
+import logging
+import argparse
+from collections import Counter
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import create_app, db
+from db_utils import ensure_schema
+from models import AcademicContent, AnalyticsRollup, ColdSegment
+from cold_storage import iter_archived_rows
+
+logger = logging.getLogger(__name__)
+
+ALL_FIELDS = ''  # Rollup rows with this field hold the totals over every field
+DIMENSIONS = ('decade', 'location', 'person')
+MAX_VALUE_LENGTH = 500
+MAX_TOP_LIMIT = 100
+
+ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩', '0123456789')
+BCE_PATTERN = re.compile(r'(?<!\w)ق\s*\.?\s*م(?!\w)|قبل الميلاد|\bB\.?\s*C\.?(?:\s*E\.?)?(?![a-z])', re.IGNORECASE)
+YEAR_PATTERN = re.compile(r'(?<!\d)(\d{1,4})(?!\d)')
+ARABIC_CENTURY_PATTERN = re.compile(r'القرن\s+(.+)')
+ENGLISH_CENTURY_PATTERN = re.compile(r'(\d{1,2})\s*(?:st|nd|rd|th)\s+century', re.IGNORECASE)
+ARABIC_ORDINALS = {
+    'الأول': 1, 'الثاني': 2, 'الثالث': 3, 'الرابع': 4, 'الخامس': 5, 'السادس': 6, 'السابع': 7,
+    'الثامن': 8, 'التاسع': 9, 'العاشر': 10, 'الحادي عشر': 11, 'الثاني عشر': 12, 'الثالث عشر': 13,
+    'الرابع عشر': 14, 'الخامس عشر': 15, 'السادس عشر': 16, 'السابع عشر': 17, 'الثامن عشر': 18,
+    'التاسع عشر': 19, 'العشرين': 20, 'الحادي والعشرين': 21
+}
+# Longest first, so 'الثاني عشر' is not read as 'الثاني'
+ORDINALS_BY_LENGTH = sorted(ARABIC_ORDINALS, key=len, reverse=True)
+
+
+def parse_century(text):
+    match = ENGLISH_CENTURY_PATTERN.search(text)
+    if match:
+        return int(match.group(1))
+    match = ARABIC_CENTURY_PATTERN.search(text)
+    if not match:
+        return None
+    rest = match.group(1).strip()
+    digits = re.match(r'\d{1,2}(?!\d)', rest)
+    if digits:
+        return int(digits.group())
+    for name in ORDINALS_BY_LENGTH:
+        if rest.startswith(name):
+            return ARABIC_ORDINALS[name]
+    return None
+
+
+def normalize_year(text):
+    """Best-effort year from a free-text date, negative for BCE; None if there is none
+
+    Handles '1905', '1960s', 'March 1687', Arabic-Indic digits and centuries
+    such as 'القرن السادس ق.م' or '18th century', which map to their first year.
+    """
+    if not text:
+        return None
+    text = text.translate(ARABIC_DIGITS)
+    bce = bool(BCE_PATTERN.search(text))
+
+    century = parse_century(text)
+    if century:
+        return -century * 100 if bce else (century - 1) * 100
+
+    for match in YEAR_PATTERN.finditer(text):
+        year = int(match.group(1))
+        # Short numbers are usually days of the month unless marked BCE
+        if bce and year > 0:
+            return -year
+        if 100 <= year <= 2100:
+            return year
+    return None
+
+
+def decade_of(year):
+    return None if year is None else year // 10 * 10
+
+
+def people_of(key_people):
+    if not key_people:
+        return []
+    if isinstance(key_people, str):
+        key_people = json.loads(key_people)
+    return list(dict.fromkeys(person.strip() for person in key_people if person and person.strip()))
+
+
+def rollup_values(row):
+    """(dimension, value) pairs one row contributes; row is a mapping of column values"""
+    values = []
+    decade = decade_of(normalize_year(row.get('date')))
+    if decade is not None:
+        values.append(('decade', str(decade)))
+    location = (row.get('location') or '').strip()
+    if location:
+        values.append(('location', location[:MAX_VALUE_LENGTH]))
+    values.extend(('person', person[:MAX_VALUE_LENGTH]) for person in people_of(row.get('key_people')))
+    return values
+
+
+def row_deltas(rows, sign=1, deltas=None):
+    """Add each row's contribution (sign -1 to remove it) to a Counter keyed by (dimension, field, value)"""
+    deltas = Counter() if deltas is None else deltas
+    for row in rows:
+        field = row.get('field') or ''
+        for dimension, value in rollup_values(row):
+            deltas[(dimension, field, value)] += sign
+            deltas[(dimension, ALL_FIELDS, value)] += sign
+    return deltas
+
+
+def apply_deltas(deltas, chunk_size=1000):
+    """Add counts to the rollup table in the current transaction; the caller commits"""
+    rows = [{'dimension': dimension, 'field': field, 'value': value, 'item_count': count}
+            for (dimension, field, value), count in deltas.items() if count]
+    if not rows:
+        return
+
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(AnalyticsRollup)
+        statement = statement.on_conflict_do_update(
+            index_elements=['dimension', 'field', 'value'],
+            set_={'item_count': AnalyticsRollup.item_count + statement.excluded.item_count}
+        )
+        for start in range(0, len(rows), chunk_size):
+            db.session.execute(statement, rows[start:start + chunk_size])
+        return
+
+    for row in rows:
+        existing = db.session.get(AnalyticsRollup, (row['dimension'], row['field'], row['value']))
+        if existing:
+            existing.item_count += row['item_count']
+        else:
+            db.session.add(AnalyticsRollup(**row))
+
+
+def record_rows(rows, sign=1):
+    """Count inserted (or, with sign=-1, replaced) AcademicContent rows into the rollups"""
+    apply_deltas(row_deltas(rows, sign))
+
+
+def rebuild_rollups(chunk_size=5000):
+    """Recompute every rollup from AcademicContent and the archived rows; for bulk loads, reclassification and deletes"""
+    deltas = Counter()
+    last_id = 0
+    scanned = 0
+    while True:
+        rows = db.session.execute(
+            db.select(AcademicContent.id, AcademicContent.field, AcademicContent.date,
+                      AcademicContent.location, AcademicContent.key_people)
+            .where(AcademicContent.id > last_id)
+            .order_by(AcademicContent.id)
+            .limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        scanned += len(rows)
+        row_deltas(rows, 1, deltas)
+
+    for row in iter_archived_rows():
+        scanned += 1
+        row_deltas([row], 1, deltas)
+
+    db.session.execute(db.delete(AnalyticsRollup))
+    apply_deltas(deltas)
+    db.session.commit()
+    logger.info(f"Rebuilt analytics rollups: {scanned} rows, {len(deltas)} rollup entries")
+    return scanned, len(deltas)
+
+
+def ensure_rollups():
+    """Rebuild the rollups when rows exist but nothing was ever counted; True if it rebuilt
+
+    Covers databases filled before the rollups existed or by loaders that
+    insert directly instead of going through DataProcessor.
+    """
+    has_rollups = db.session.execute(db.select(AnalyticsRollup.dimension).limit(1)).first() is not None
+    if has_rollups:
+        return False
+    has_rows = db.session.execute(db.select(AcademicContent.id).limit(1)).first() is not None
+    has_archive = db.session.execute(db.select(ColdSegment.id).limit(1)).first() is not None
+    if not has_rows and not has_archive:
+        return False
+    rebuild_rollups()
+    return True
+
+
+def decade_counts(field=ALL_FIELDS):
+    """[{'decade', 'count'}] in chronological order"""
+    rows = db.session.execute(
+        db.select(AnalyticsRollup.value, AnalyticsRollup.item_count)
+        .where(AnalyticsRollup.dimension == 'decade', AnalyticsRollup.field == field,
+               AnalyticsRollup.item_count > 0)
+    ).all()
+    return sorted(({'decade': int(value), 'count': count} for value, count in rows), key=lambda row: row['decade'])
+
+
+def decade_field_counts():
+    """[{'decade', 'count', 'fields': {field: count}}] for every field at once"""
+    rows = db.session.execute(
+        db.select(AnalyticsRollup.field, AnalyticsRollup.value, AnalyticsRollup.item_count)
+        .where(AnalyticsRollup.dimension == 'decade', AnalyticsRollup.item_count > 0)
+    ).all()
+    decades = {}
+    for field, value, count in rows:
+        entry = decades.setdefault(int(value), {'decade': int(value), 'count': 0, 'fields': {}})
+        if field == ALL_FIELDS:
+            entry['count'] = count
+        else:
+            entry['fields'][field] = count
+    return [decades[decade] for decade in sorted(decades)]
+
+
+def top_values(dimension, field=ALL_FIELDS, limit=20):
+    """Most frequent values of a dimension, read straight off the (dimension, field, count) index"""
+    rows = db.session.execute(
+        db.select(AnalyticsRollup.value, AnalyticsRollup.item_count)
+        .where(AnalyticsRollup.dimension == dimension, AnalyticsRollup.field == field,
+               AnalyticsRollup.item_count > 0)
+        .order_by(AnalyticsRollup.item_count.desc(), AnalyticsRollup.value)
+        .limit(min(limit, MAX_TOP_LIMIT))
+    ).all()
+    return [{'value': value, 'count': count} for value, count in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help='recompute all rollups from AcademicContent')
+    show_parser = subparsers.add_parser('show', help='print decade counts and top locations and people')
+    show_parser.add_argument('--field', default=ALL_FIELDS)
+    show_parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        if args.command == 'rebuild':
+            scanned, entries = rebuild_rollups()
+            print(f"Rebuilt rollups from {scanned} rows ({entries} entries)")
+        elif args.command == 'show':
+            for row in decade_counts(args.field):
+                print(f"{row['decade']:>6}s {row['count']:>8}")
+            for dimension in ('location', 'person'):
+                print(f"Top {dimension}s: " + ', '.join(f"{row['value']} ({row['count']})"
+                                                        for row in top_values(dimension, args.field, args.limit)))
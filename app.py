@@ -4,51 +4,78 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+from storage import configure_storage, init_storage, RoutingSession
+from profiling import init_profiler
+from compression import CompressionMiddleware
 
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
+
+# Third-party loggers that are chatty at INFO/DEBUG
+QUIET_LOGGERS = ['urllib3', 'trafilatura', 'htmldate', 'charset_normalizer', 'werkzeug']
+
+
+def configure_logging():
+    """Log at LOG_LEVEL (INFO by default); DEBUG slows the crawl hot loop"""
+    level = getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    logging.basicConfig(level=level)
+    logging.getLogger().setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(level, logging.WARNING))
 
-# Create the app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-for-academic-crawler")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Configure the database
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///academic_data.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+def create_app(config=None):
+    """Build the Flask app without touching the schema or importing the crawler"""
+    configure_logging()
 
-# Initialize the app with the extension
-db.init_app(app)
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-for-academic-crawler")
+    app.wsgi_app = CompressionMiddleware(ProxyFix(app.wsgi_app, x_proto=1, x_host=1))
+    # Compact UTF-8 JSON: Arabic text as \uXXXX escapes and indentation roughly double the payload
+    app.json.compact = True
+    app.json.ensure_ascii = False
 
-with app.app_context():
-    # Import models to ensure tables are created
+    # Configure the database
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///academic_data.db")
+    app.config["SQL_PROFILING"] = os.environ.get("SQL_PROFILING", "").lower() in ("1", "true", "yes")
+    if config:
+        app.config.update(config)
+    # Engine options, SQLite pragmas and the optional read replica depend on the backend
+    configure_storage(app)
+
+    # Initialize the app with the extension
+    db.init_app(app)
+    init_storage(app, db)
+    init_profiler(app, db)
+
+    # Import models so they are registered on the metadata
     import models
-    db.create_all()
 
-# Add custom JSON filter for templates
-import json
+    # Import and register routes
+    from routes import bp
+    app.register_blueprint(bp)
+
+    register_commands(app)
+    return app
 
-@app.template_filter('tojsonpretty')
-def to_json_pretty(value):
-    return json.dumps(value, ensure_ascii=False, indent=2)
 
-@app.template_filter('number_format')
-def number_format(value):
-    """Format numbers with thousands separator"""
-    if isinstance(value, (int, float)):
-        return "{:,}".format(value)
-    return value
+def register_commands(app):
+    @app.cli.command('init-db')
+    def init_db():
+        """Create missing tables, columns and indexes, and fill the analytics rollups if they are empty"""
+        from db_utils import ensure_schema
+        from analytics import ensure_rollups
+        ensure_schema()
+        if ensure_rollups():
+            print("Built analytics rollups from the existing rows")
+        print("Database schema is up to date")
 
-# Import and register routes
-from routes import *
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        from db_utils import ensure_schema
+        ensure_schema()
     app.run(host='0.0.0.0', port=5000, debug=True)
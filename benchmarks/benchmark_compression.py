@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Response bytes and latency of the JSON endpoints: legacy output vs compact + compressed
+
+Legacy is indented JSON with ASCII-escaped Arabic and no Content-Encoding,
+as the API used to send it. Transfer time is estimated at --mbps so the
+result reflects a remote client rather than the loopback test client.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+ENDPOINTS = [
+    ('api_field', '/api/data/field/فيزياء'),
+    ('api_sample', '/api/data/sample?limit=100'),
+    ('api_statistics', '/api/statistics'),
+    ('download_json', '/download_json'),
+    ('api_data', '/api/data'),
+]
+
+
+def measure(client, path, encoding, runs):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    timings = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        size = len(response.get_data())
+        timings.append(time.perf_counter() - start)
+    return size, sorted(timings)[len(timings) // 2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--mbps', type=float, default=20, help='client bandwidth for the transfer estimate')
+    parser.add_argument('--skip', nargs='*', default=[], help='endpoint names to leave out')
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    bytes_per_second = args.mbps * 1e6 / 8
+
+    print(f"{'endpoint':15} {'mode':8} {'bytes':>12} {'server ms':>10} {'total ms':>10}")
+    for name, path in ENDPOINTS:
+        if name in args.skip:
+            continue
+        app.json.compact, app.json.ensure_ascii = False, True
+        legacy_path = path + ('?pretty=1' if name == 'download_json' else '')
+        results = [('legacy', measure(client, legacy_path, None, args.runs))]
+        app.json.compact, app.json.ensure_ascii = True, False
+        results.append(('compact', measure(client, path, None, args.runs)))
+        results.append(('gzip', measure(client, path, 'gzip', args.runs)))
+        results.append(('br', measure(client, path, 'br', args.runs)))
+        for mode, (size, seconds) in results:
+            total = seconds + size / bytes_per_second
+            print(f"{name:15} {mode:8} {size:12} {seconds * 1000:10.1f} {total * 1000:10.1f}")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Benchmark the structured extractor against the original per-page function"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from crawler import AcademicCrawler
+
+WORDS = ['physics', 'quantum', 'cell', 'galaxy', 'history', 'theory', 'study', 'experiment',
+         'molecule', 'algorithm', 'climate', 'discovered', 'principle', 'the', 'of', 'and',
+         'energy', 'research', 'university', 'science', 'observed', 'results', 'law']
+NAMES = ['Albert Einstein', 'Marie Curie', 'Isaac Newton', 'Charles Darwin', 'Alan Turing']
+
+
+def build_corpus(size, seed=42):
+    """Build a fixed corpus of fake pages so runs are comparable"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        sentences = []
+        for _ in range(rng.randint(20, 60)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(4, 30))]
+            if rng.random() < 0.1:
+                words.insert(0, rng.choice(NAMES))
+            if rng.random() < 0.05:
+                words.append(str(rng.randint(1900, 2024)))
+            sentences.append(' '.join(words).capitalize())
+        text = '. '.join(sentences) + '.'
+        html = f"<html><head><title>Page {i}</title></head><body><h1>Topic {i}</h1><p>{text}</p></body></html>"
+        corpus.append({
+            'text': text,
+            'soup': BeautifulSoup(html, 'html.parser'),
+            'url': f"https://www.britannica.com/science/{rng.choice(['physics', 'biology', 'astronomy'])}/{i}"
+        })
+    return corpus
+
+
+def legacy_extract_structured_data(crawler, content_data):
+    """The extraction code as it was before the extractor module"""
+    if not content_data or not content_data['text']:
+        return None
+
+    text = content_data['text']
+    soup = content_data['soup']
+    url = content_data['url']
+
+    title = None
+    for selector in ['h1', 'title', '.title', '.page-title']:
+        title_elem = soup.select_one(selector)
+        if title_elem:
+            title = title_elem.get_text().strip()
+            break
+    if not title:
+        title = "محتوى علمي"
+
+    field = crawler.classify_content_field(text, url)
+    dates = re.findall(r'\b(19|20)\d{2}\b', text)
+    names = re.findall(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', text)
+    key_people = list(set(names[:5]))
+
+    sentences = text.split('.')
+    summary = ""
+    for sentence in sentences:
+        if len(sentence.strip()) > 50 and not sentence.strip().startswith(('http', 'www')):
+            summary = sentence.strip()
+            break
+
+    facts = []
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if any(pattern in sentence.lower() for pattern in ['discovered', 'invented', 'theory', 'law', 'principle']):
+            if len(sentence) > 20 and len(sentence) < 200:
+                facts.append(sentence)
+                if len(facts) >= 3:
+                    break
+
+    content_type = "معلومة علمية"
+    if any(word in text.lower() for word in ['theory', 'theorem']):
+        content_type = "نظرية علمية"
+    elif any(word in text.lower() for word in ['experiment', 'study']):
+        content_type = "تجربة علمية"
+    elif any(word in text.lower() for word in ['discovery', 'invention']):
+        content_type = "اكتشاف علمي"
+
+    return {
+        'type': content_type,
+        'title': title[:200],
+        'field': field,
+        'date': dates[0] if dates else "",
+        'location': "",
+        'key_people': key_people,
+        'summary': summary[:500] if summary else text[:500],
+        'verified_facts': facts
+    }
+
+
+def run_benchmark(size, repeat):
+    crawler = AcademicCrawler()
+    corpus = build_corpus(size)
+
+    legacy_best = None
+    batch_best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        legacy_results = [legacy_extract_structured_data(crawler, page) for page in corpus]
+        elapsed = time.perf_counter() - start
+        legacy_best = elapsed if legacy_best is None else min(legacy_best, elapsed)
+
+        start = time.perf_counter()
+        batch_results = crawler.extractor.extract_batch(corpus)
+        elapsed = time.perf_counter() - start
+        batch_best = elapsed if batch_best is None else min(batch_best, elapsed)
+
+    mismatches = sum(
+        1 for old, new in zip(legacy_results, batch_results)
+        if (old['title'], old['field'], old['type'], old['summary'], old['verified_facts']) !=
+           (new['title'], new['field'], new['type'], new['summary'], list(new['verified_facts']))
+    )
+
+    print(f"Corpus: {size} pages, best of {repeat} runs")
+    print(f"Legacy extract_structured_data: {legacy_best:.3f}s ({size / legacy_best:,.0f} pages/s)")
+    print(f"StructuredExtractor.extract_batch: {batch_best:.3f}s ({size / batch_best:,.0f} pages/s)")
+    print(f"Speedup: {legacy_best / batch_best:.2f}x, mismatched records: {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.pages, args.repeat)
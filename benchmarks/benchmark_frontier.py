@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Pages fetched to reach a target item count: FIFO link queue vs the best-first frontier
+
+Runs offline against a synthetic site graph shaped like a university or
+agency site: every page carries a header of boilerplate links (about,
+events, careers, ...) and a mix of navigation and article links, and some
+fields are much rarer than others. "fifo" reproduces the old crawl_domain
+policy (first 10 new links per page, no new links past 80% of the budget);
+"best-first" queues every link in a BestFirstQueue.
+"""
+
+import os
+import sys
+import random
+import argparse
+from collections import deque, Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from academic_sources import FIELD_KEYWORDS
+from link_priority import FieldQuota, LinkScorer, BestFirstQueue
+
+FIELDS = list(FIELD_KEYWORDS)
+BOILERPLATE = ['about', 'events', 'careers', 'donate', 'newsletter', 'directory', 'help', 'sitemap']
+NAV_ANCHORS = ['More', 'Next page', 'Browse', 'Home', 'Overview', 'Read more']
+
+
+def field_weights(skew):
+    """Share of articles per field: the first fields are common, the last ones rare"""
+    return [skew ** index for index in range(len(FIELDS))]
+
+
+class SyntheticSite:
+    """Deterministic page graph; a page's kind, field and links derive from its number"""
+
+    def __init__(self, pages, skew=0.7, article_ratio=0.35, seed=0):
+        self.pages = pages
+        self.weights = field_weights(skew)
+        self.article_ratio = article_ratio
+        self.seed = seed
+
+    def kind(self, number):
+        if number < len(BOILERPLATE):
+            return 'boilerplate', None
+        rng = random.Random(self.seed * 1_000_003 + number)
+        if rng.random() >= self.article_ratio:
+            return 'nav', None
+        return 'article', rng.choices(FIELDS, self.weights)[0]
+
+    def url(self, number):
+        kind, field = self.kind(number)
+        if kind == 'boilerplate':
+            return f"https://site.edu/{BOILERPLATE[number]}"
+        if kind == 'nav':
+            return f"https://site.edu/section/{number}"
+        # Half the article URLs carry a keyword slug, the rest only an id
+        rng = random.Random(number)
+        if rng.random() < 0.5:
+            return f"https://site.edu/news/{FIELD_KEYWORDS[field][0].lower().replace(' ', '-')}-{number}"
+        return f"https://site.edu/article?id={number}"
+
+    def anchor(self, number):
+        kind, field = self.kind(number)
+        rng = random.Random(number * 7 + 1)
+        if kind == 'boilerplate':
+            return BOILERPLATE[number].title()
+        if kind == 'nav' or rng.random() < 0.3:
+            return rng.choice(NAV_ANCHORS)
+        return f"New findings on {rng.choice(FIELD_KEYWORDS[field])} research"
+
+    def links(self, number):
+        """Boilerplate header first, then 25 links into the rest of the site"""
+        rng = random.Random(self.seed + number * 13)
+        children = [rng.randrange(len(BOILERPLATE), self.pages) for _ in range(25)]
+        return list(range(len(BOILERPLATE))) + children
+
+
+def crawl_fifo(site, start, max_pages, target):
+    queue = deque([start])
+    queued = {start}
+    fetched = 0
+    items = Counter()
+    while queue and fetched < max_pages and sum(items.values()) < target:
+        number = queue.popleft()
+        fetched += 1
+        kind, field = site.kind(number)
+        if kind == 'article':
+            items[field] += 1
+        if fetched < max_pages * 0.8:
+            added = 0
+            for child in site.links(number):
+                if added >= 10:
+                    break
+                if child not in queued:
+                    queued.add(child)
+                    queue.append(child)
+                    added += 1
+    return fetched, items
+
+
+def crawl_best_first(site, start, max_pages, target):
+    quota = FieldQuota(target)
+    frontier = BestFirstQueue(LinkScorer(quota))
+    numbers = {site.url(start): start}
+    frontier.add(site.url(start))
+    queued = {start}
+    fetched = 0
+    items = Counter()
+    while frontier and fetched < max_pages and sum(items.values()) < target:
+        url, depth = frontier.pop()
+        number = numbers[url]
+        fetched += 1
+        kind, field = site.kind(number)
+        if kind == 'article':
+            items[field] += 1
+            quota.add(field)
+        for child in site.links(number):
+            if child not in queued:
+                queued.add(child)
+                numbers[site.url(child)] = child
+                frontier.add(site.url(child), site.anchor(child), depth + 1)
+    return fetched, items
+
+
+def report(name, fetched, items, target):
+    total = sum(items.values())
+    share = target / len(FIELDS)
+    covered = sum(1 for field in FIELDS if items[field] >= share * 0.5)
+    print(f"{name:11} {fetched:8} {total:7} {total / fetched if fetched else 0:11.2f} "
+          f"{covered:>5}/{len(FIELDS)}  rarest={min(items[field] for field in FIELDS)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=200000, help='pages in the synthetic site')
+    parser.add_argument('--target', type=int, default=2000, help='items to collect')
+    parser.add_argument('--max-pages', type=int, default=20000, help='fetch budget')
+    parser.add_argument('--skew', type=float, default=0.7, help='field frequency decay (1.0 = uniform)')
+    args = parser.parse_args()
+
+    site = SyntheticSite(args.pages, args.skew)
+    start = len(BOILERPLATE)
+    print(f"{'policy':11} {'fetched':>8} {'items':>7} {'items/page':>11} {'fields >= half share':>20}")
+    report('fifo', *crawl_fifo(site, start, args.max_pages, args.target), args.target)
+    report('best-first', *crawl_best_first(site, start, args.max_pages, args.target), args.target)
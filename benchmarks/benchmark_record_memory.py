@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Measure the per-item memory of crawl records: plain dicts vs AcademicRecord"""
+
+import os
+import sys
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import AcademicRecord
+
+FIELDS = ['فيزياء', 'كيمياء', 'رياضيات', 'أحياء', 'تاريخ', 'فلك', 'علوم الأرض', 'حاسوب', 'تغذية', 'بيئة']
+TYPES = ['نظرية علمية', 'تجربة علمية', 'اكتشاف علمي', 'معلومة علمية']
+PEOPLE = ['Albert Einstein', 'Marie Curie', 'Isaac Newton', 'Charles Darwin', 'Alan Turing']
+
+
+def make_item(rng, index):
+    """Item as extract_structured_data used to return it; strings are built fresh like parsed text"""
+    return {
+        'type': ''.join(rng.choice(TYPES)),
+        'title': f"Topic {index} " + 'x' * rng.randint(10, 60),
+        'field': ''.join(rng.choice(FIELDS)),
+        'date': str(rng.randint(1900, 2024)),
+        'location': '',
+        'key_people': [''.join(name) for name in rng.sample(PEOPLE, rng.randint(0, 3))],
+        'summary': 'word ' * rng.randint(20, 100),
+        'verified_facts': ['fact ' * rng.randint(4, 30) for _ in range(rng.randint(0, 3))],
+        'source_url': f"https://www.britannica.com/science/topic-{index}"
+    }
+
+
+def measure(count, as_records):
+    rng = random.Random(42)
+    tracemalloc.start()
+    items = []
+    for index in range(count):
+        item = make_item(rng, index)
+        items.append(AcademicRecord.from_dict(item) if as_records else item)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=290000)
+    args = parser.parse_args()
+
+    dict_bytes = measure(args.items, as_records=False)
+    record_bytes = measure(args.items, as_records=True)
+    print(f"{args.items:,} items")
+    print(f"dict:           {dict_bytes / 2**20:8.1f} MiB, {dict_bytes / args.items:6.0f} bytes/item")
+    print(f"AcademicRecord: {record_bytes / 2**20:8.1f} MiB, {record_bytes / args.items:6.0f} bytes/item")
+    print(f"Saved: {(dict_bytes - record_bytes) / 2**20:.1f} MiB ({1 - record_bytes / dict_bytes:.0%})")
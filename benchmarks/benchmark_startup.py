@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Cold-start cost of a web worker: importing the app module and building the app
+
+Each sample runs in a fresh interpreter, the way a gunicorn worker boots. It
+reports import and create_app times, the module count, and whether the heavy
+crawl-only dependencies were loaded.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['crawler', 'trafilatura', 'bs4', 'lxml', 'requests']
+
+PROBE = """
+import sys, json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+built = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (built - imported) * 1000,
+    'modules': len(sys.modules),
+    'heavy': [name for name in %r if name in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def sample(env):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    env.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+    results = [sample(env) for _ in range(args.runs)]
+
+    for key in ('import_ms', 'create_app_ms', 'process_ms'):
+        print(f"{key:14} median={median([r[key] for r in results]):8.1f} max={max(r[key] for r in results):8.1f}")
+    print(f"modules loaded: {results[-1]['modules']}")
+    print(f"heavy modules loaded: {', '.join(results[-1]['heavy']) or 'none'}")
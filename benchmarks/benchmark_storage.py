@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Mixed read/write load on SQLite with and without the tuned storage profile
+
+A writer thread inserts rows in long transactions, like save_to_database
+during a crawl, while reader threads run the dashboard's count and
+paginated queries. Read latency percentiles are reported per profile.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from storage import install_sqlite_pragmas
+
+SCHEMA = """
+CREATE TABLE academic_content (
+    id INTEGER PRIMARY KEY, type TEXT, title TEXT, field TEXT, date TEXT,
+    summary TEXT, verified_facts TEXT
+)
+"""
+INSERT = text("INSERT INTO academic_content (type, title, field, date, summary, verified_facts) "
+              "VALUES (:type, :title, :field, :date, :summary, :facts)")
+READS = [
+    text("SELECT count(*) FROM academic_content"),
+    text("SELECT * FROM academic_content WHERE field = :field ORDER BY date DESC, id DESC LIMIT 24 OFFSET :offset"),
+    text("SELECT field, count(id) FROM academic_content GROUP BY field"),
+]
+FIELDS = ['فيزياء', 'كيمياء', 'رياضيات', 'أحياء', 'تاريخ', 'فلك']
+
+
+def make_row(rng, index):
+    return {
+        'type': 'نظرية علمية', 'title': f"عنوان {index}", 'field': rng.choice(FIELDS),
+        'date': str(rng.randint(1500, 2024)), 'summary': 'ملخص ' * 40, 'facts': '["حقيقة"]'
+    }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_profile(tuned, seed_rows, duration, readers, write_batch):
+    path = os.path.join(tempfile.mkdtemp(prefix='storage-bench-'), 'bench.db')
+    engine = create_engine(f"sqlite:///{path}", connect_args={'timeout': 30})
+    if tuned:
+        install_sqlite_pragmas(engine)
+
+    rng = random.Random(1)
+    with engine.begin() as connection:
+        connection.execute(text(SCHEMA))
+        connection.execute(text("CREATE INDEX ix_field ON academic_content (field)"))
+        connection.execute(INSERT, [make_row(rng, i) for i in range(seed_rows)])
+
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    written = [0]
+    lock = threading.Lock()
+
+    def writer():
+        writer_rng = random.Random(2)
+        index = seed_rows
+        while not stop.is_set():
+            try:
+                with engine.begin() as connection:
+                    for _ in range(write_batch):
+                        connection.execute(INSERT, make_row(writer_rng, index))
+                        index += 1
+                written[0] += write_batch
+            except Exception as e:
+                errors.append(f"write: {e}")
+
+    def reader(seed):
+        reader_rng = random.Random(seed)
+        while not stop.is_set():
+            statement = reader_rng.choice(READS)
+            start = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(statement, {'field': reader_rng.choice(FIELDS),
+                                                   'offset': reader_rng.randint(0, 200) * 24}).fetchall()
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(f"read: {e}")
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        'reads': len(latencies),
+        'reads_per_sec': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'rows_written_per_sec': written[0] / duration,
+        'errors': len(errors)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--write-batch', type=int, default=2000, help='rows per write transaction')
+    args = parser.parse_args()
+
+    for name, tuned in (('default', False), ('tuned', True)):
+        result = run_profile(tuned, args.rows, args.duration, args.readers, args.write_batch)
+        print(f"{name:8} reads/s={result['reads_per_sec']:8.1f} p50={result['p50_ms']:7.1f}ms "
+              f"p95={result['p95_ms']:7.1f}ms p99={result['p99_ms']:7.1f}ms "
+              f"writes/s={result['rows_written_per_sec']:8.0f} errors={result['errors']}")
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""HTTP load test for the web tier at a chosen corpus size
+
+    load_test.py run --rows 1000000 --concurrency 16 --duration 60 --output release.json
+    load_test.py compare before.json after.json
+
+'run' seeds a SQLite database with synthetic rows (reused when it already
+holds that many), starts the app under gunicorn (or the threaded Werkzeug
+server when gunicorn is not installed), replays a weighted mix of requests
+from concurrent clients and writes per-route latency percentiles, throughput
+and error counts as JSON.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import platform
+import threading
+import subprocess
+from datetime import datetime
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEED_BATCH = 5000
+SEARCH_TERMS = ['نظرية', 'اكتشاف', 'قانون', 'دراسة', 'الجاذبية', 'الخلية']
+
+# name: (weight, path builder taking (rng, fields, rows))
+PROFILE = {
+    'index': (10, lambda rng, fields, rows: '/'),
+    'all_data': (25, lambda rng, fields, rows: '/all-data'),
+    'all_data_deep': (10, lambda rng, fields, rows: f"/all-data?page={rng.randint(2, max(2, rows // 24))}"),
+    'all_data_search': (15, lambda rng, fields, rows: f"/all-data?search={rng.choice(SEARCH_TERMS)}&page={rng.randint(1, 5)}"),
+    'all_data_filter': (15, lambda rng, fields, rows: f"/all-data?field={rng.choice(fields)}&page={rng.randint(1, 50)}"),
+    'api_field': (5, lambda rng, fields, rows: f"/api/data/field/{rng.choice(fields)}"),
+    'api_statistics': (10, lambda rng, fields, rows: '/api/statistics'),
+    'api_sample': (10, lambda rng, fields, rows: '/api/data/sample?limit=20'),
+    # Dumps the whole table; off by default because it dominates at large sizes
+    'api_data': (0, lambda rng, fields, rows: '/api/data'),
+}
+
+
+def seed_database(path, rows):
+    """Fill path with rows synthetic records unless it already holds that many"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{path}"
+    from app import create_app, db
+    from models import AcademicContent
+    from db_utils import ensure_schema
+    from fingerprint import record_hash
+    from generate_large_dataset import FIELDS, generate_academic_entry
+    from analytics import ensure_rollups, rebuild_rollups
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        existing = db.session.query(db.func.count(AcademicContent.id)).scalar()
+        if existing == rows:
+            print(f"Reusing {path} with {rows} rows", file=sys.stderr)
+            ensure_rollups()
+            return list(FIELDS)
+        if existing:
+            db.session.query(AcademicContent).delete()
+            db.session.commit()
+
+        random.seed(rows)
+        field_items = list(FIELDS.items())
+        started = time.monotonic()
+        batch = []
+        for index in range(rows):
+            field_name, field_data = field_items[index % len(field_items)]
+            entry = generate_academic_entry(field_name, field_data, index + 1)
+            # Unique titles and bodies, like a deduplicated corpus
+            entry['title'] = f"{entry['title']} {index}"
+            entry['summary'] = f"{entry['summary']} {index}"
+            batch.append({
+                'type': entry['type'], 'title': entry['title'], 'field': entry['field'],
+                'date': entry['date'], 'location': entry['location'],
+                'key_people': json.dumps(entry['key_people'], ensure_ascii=False),
+                'summary': entry['summary'],
+                'verified_facts': json.dumps(entry['verified_facts'], ensure_ascii=False),
+                'source_url': f"{entry['source_url']}/{index}",
+                'crawled_at': datetime.utcnow(),
+                'content_hash': record_hash(entry['summary'], entry['verified_facts'])
+            })
+            if len(batch) >= SEED_BATCH:
+                db.session.execute(db.insert(AcademicContent), batch)
+                db.session.commit()
+                batch = []
+                print(f"Seeded {index + 1}/{rows} rows", file=sys.stderr)
+        if batch:
+            db.session.execute(db.insert(AcademicContent), batch)
+            db.session.commit()
+        # Direct inserts skip the ingest-time rollup updates
+        rebuild_rollups()
+        print(f"Seeded {rows} rows in {time.monotonic() - started:.0f}s", file=sys.stderr)
+        return list(FIELDS)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(path, port, workers, threads):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}", LOG_LEVEL='WARNING', GUNICORN_THREADS=str(threads))
+    try:
+        import gunicorn  # noqa: F401
+        command = [sys.executable, '-m', 'gunicorn', '--bind', f"127.0.0.1:{port}",
+                   '--workers', str(workers), '--threads', str(threads), 'main:app']
+        server = 'gunicorn'
+    except ImportError:
+        command = [sys.executable, '-c',
+                   f"from main import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+        server = 'werkzeug'
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/crawling_status", timeout=1)
+            return process, base_url, server
+        except requests.RequestException:
+            if process.poll() is not None:
+                raise RuntimeError(f"{server} exited with code {process.returncode}")
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{server} did not start within 60s")
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / count * 1000, 2) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if count else 0.0
+    }
+
+
+def run_load(base_url, profile, fields, rows, concurrency, duration, warmup, timeout):
+    """Closed-loop clients: each sends its next request as soon as the previous one returns"""
+    names = [name for name, (weight, _) in profile.items() if weight > 0]
+    weights = [profile[name][0] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    measuring = threading.Event()
+    stop = threading.Event()
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while not stop.is_set():
+            name = rng.choices(names, weights)[0]
+            path = profile[name][1](rng, fields, rows)
+            start = time.perf_counter()
+            try:
+                failed = session.get(base_url + path, timeout=timeout).status_code >= 400
+            except requests.RequestException:
+                failed = True
+            elapsed = time.perf_counter() - start
+            if not measuring.is_set():
+                continue
+            with lock:
+                if failed:
+                    errors[name] += 1
+                else:
+                    latencies[name].append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(seed,), daemon=True) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(warmup)
+    measuring.set()
+    started = time.monotonic()
+    time.sleep(duration)
+    measuring.clear()
+    elapsed = time.monotonic() - started
+    stop.set()
+    for thread in threads:
+        thread.join(timeout + 1)
+
+    routes = {name: summarize(latencies[name], errors[name], elapsed) for name in names}
+    overall = summarize([value for name in names for value in latencies[name]], sum(errors.values()), elapsed)
+    return routes, overall
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def parse_profile(spec):
+    """'all_data=40,api_statistics=5' overrides the default weights"""
+    profile = dict(PROFILE)
+    for part in filter(None, (spec or '').split(',')):
+        name, weight = part.split('=')
+        if name not in PROFILE:
+            raise SystemExit(f"Unknown route {name}; choose from {', '.join(PROFILE)}")
+        profile[name] = (int(weight), PROFILE[name][1])
+    return profile
+
+
+def print_table(routes, overall, stream=sys.stderr):
+    print(f"{'route':18} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}", file=stream)
+    for name, result in list(routes.items()) + [('TOTAL', overall)]:
+        print(f"{name:18} {result['requests']:7} {result['errors']:5} {result['throughput_rps']:8.1f} "
+              f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f}", file=stream)
+
+
+def command_run(args):
+    path = args.database or os.path.join(tempfile.gettempdir(), f"academic-load-{args.rows}.db")
+    fields = seed_database(path, args.rows)
+    profile = parse_profile(args.profile)
+
+    process, base_url, server = start_server(path, free_port(), args.workers, args.threads)
+    try:
+        routes, overall = run_load(base_url, profile, fields, args.rows, args.concurrency,
+                                   args.duration, args.warmup, args.timeout)
+    finally:
+        process.terminate()
+        process.wait(10)
+
+    report = {
+        'meta': {
+            'revision': git_revision(), 'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'rows': args.rows, 'concurrency': args.concurrency, 'duration': args.duration,
+            'server': server, 'workers': args.workers, 'threads': args.threads,
+            'python': platform.python_version(),
+            'profile': {name: weight for name, (weight, _) in profile.items() if weight > 0}
+        },
+        'routes': routes,
+        'overall': overall
+    }
+    print_table(routes, overall)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+def command_compare(args):
+    """Per-route change from a baseline report to a candidate"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{'route':18} {'metric':15} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    names = list(candidate['routes']) + ['overall']
+    for name in names:
+        old = baseline['overall'] if name == 'overall' else baseline['routes'].get(name)
+        new = candidate['overall'] if name == 'overall' else candidate['routes'][name]
+        if old is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'errors'):
+            change = f"{(new[metric] - old[metric]) / old[metric] * 100:+.0f}%" if old[metric] else '-'
+            print(f"{name:18} {metric:15} {old[metric]:10} {new[metric]:10} {change:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='seed, start the server and replay the request mix')
+    run_parser.add_argument('--rows', type=int, default=100000)
+    run_parser.add_argument('--database', default=None, help='SQLite file to seed (default: one per size in the temp dir)')
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    run_parser.add_argument('--warmup', type=float, default=5, help='unmeasured seconds before measuring')
+    run_parser.add_argument('--timeout', type=float, default=30, help='per-request timeout')
+    run_parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    run_parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    run_parser.add_argument('--profile', default=None, help='route weights, e.g. all_data=40,api_data=1')
+    run_parser.add_argument('--output', default=None, help='write the JSON report here instead of stdout')
+
+    compare_parser = subparsers.add_parser('compare', help='diff two JSON reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        command_run(args)
+    else:
+        command_compare(args)
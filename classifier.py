@@ -0,0 +1,147 @@
+"""
+Batch field classifier: sparse term vectors scored against per-field centroids
+"""
+
+import re
+import logging
+from collections import Counter
+
+import numpy as np
+
+from academic_sources import FIELD_KEYWORDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIELD = 'علوم عامة'
+TOKEN_PATTERN = re.compile(r'\w+')
+MAX_FEATURES = 20000
+MIN_DOCUMENT_FREQUENCY = 3
+MAX_DOCUMENT_RATIO = 0.5    # Terms in more than half of the documents don't separate fields
+KEYWORD_WEIGHT = 3.0        # Weight of the FIELD_KEYWORDS prior against the corpus mean
+URL_WEIGHT = 5.0            # Same boost classify_content_field gives URL keyword matches
+MIN_SCORE = 0.05
+
+
+def tokenize(text):
+    """Lowercased word tokens plus adjacent-word bigrams, so 'earth science' is one feature"""
+    words = TOKEN_PATTERN.findall(text.lower()) if text else []
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+class FieldClassifier:
+    """Cosine similarity of log-scaled term vectors to one centroid per field
+
+    Centroids start from FIELD_KEYWORDS and are pulled toward the mean vector
+    of rows already labelled with that field, so Arabic vocabulary that the
+    English keywords miss still counts. Documents in a batch become one COO
+    matrix (row, term, weight) and are scored with a single scatter-add.
+    """
+
+    def __init__(self, field_keywords=FIELD_KEYWORDS):
+        self.fields = list(field_keywords)
+        self.field_keywords = {field: [keyword.lower() for keyword in keywords]
+                               for field, keywords in field_keywords.items()}
+        self.vocabulary = {}
+        self.centroids = None
+        self.build_vocabulary([])
+        self.fit_centroids([], [])
+
+    def build_vocabulary(self, documents):
+        """Keywords always; corpus terms by document frequency, capped at MAX_FEATURES"""
+        vocabulary = {}
+        for keywords in self.field_keywords.values():
+            for keyword in keywords:
+                vocabulary.setdefault(keyword, len(vocabulary))
+
+        if documents:
+            document_frequency = Counter()
+            for tokens in documents:
+                document_frequency.update(set(tokens))
+            max_frequency = max(MIN_DOCUMENT_FREQUENCY, len(documents) * MAX_DOCUMENT_RATIO)
+            candidates = [term for term, frequency in document_frequency.most_common()
+                          if MIN_DOCUMENT_FREQUENCY <= frequency <= max_frequency]
+            for term in candidates[:MAX_FEATURES]:
+                vocabulary.setdefault(term, len(vocabulary))
+
+        self.vocabulary = vocabulary
+
+    def vectorize(self, documents, urls=None):
+        """COO arrays (rows, columns, weights) for tokenized documents, rows L2-normalized"""
+        rows = []
+        columns = []
+        counts = []
+        for row, tokens in enumerate(documents):
+            term_counts = Counter(self.vocabulary[token] for token in tokens if token in self.vocabulary)
+            if urls and urls[row]:
+                url_lower = urls[row].lower()
+                for keywords in self.field_keywords.values():
+                    for keyword in keywords:
+                        if keyword in url_lower:
+                            term_counts[self.vocabulary[keyword]] += URL_WEIGHT
+            rows.extend([row] * len(term_counts))
+            columns.extend(term_counts.keys())
+            counts.extend(term_counts.values())
+
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        weights = np.log1p(np.asarray(counts, dtype=np.float64))
+
+        norms = np.zeros(len(documents))
+        np.add.at(norms, rows, weights ** 2)
+        norms = np.sqrt(norms)
+        norms[norms == 0] = 1.0
+        return rows, columns, weights / norms[rows]
+
+    def fit_centroids(self, documents, labels):
+        """Per-field centroid: normalized keyword vector blended with the labelled mean"""
+        size = len(self.vocabulary)
+        centroids = np.zeros((len(self.fields), size))
+        for index, field in enumerate(self.fields):
+            for keyword in self.field_keywords[field]:
+                centroids[index, self.vocabulary[keyword]] = 1.0
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids *= KEYWORD_WEIGHT
+
+        field_index = {field: index for index, field in enumerate(self.fields)}
+        labelled = [(tokens, field_index[label]) for tokens, label in zip(documents, labels) if label in field_index]
+        if labelled:
+            rows, columns, weights = self.vectorize([tokens for tokens, _ in labelled])
+            label_rows = np.asarray([index for _, index in labelled], dtype=np.int64)
+            sums = np.zeros((len(self.fields), size))
+            np.add.at(sums, (label_rows[rows], columns), weights)
+            totals = np.bincount(label_rows, minlength=len(self.fields)).astype(np.float64)
+            totals[totals == 0] = 1.0
+            means = sums / totals[:, None]
+            norms = np.linalg.norm(means, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids += means / norms
+
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.centroids = centroids / norms
+
+    def fit(self, texts, labels):
+        """Learn vocabulary and centroids from labelled texts (e.g. a corpus sample)"""
+        documents = [tokenize(text) for text in texts]
+        self.build_vocabulary(documents)
+        self.fit_centroids(documents, labels)
+        logger.info(f"Classifier fitted on {len(documents)} documents, {len(self.vocabulary)} terms")
+        return self
+
+    def scores(self, texts, urls=None):
+        """(documents x fields) cosine similarities"""
+        rows, columns, weights = self.vectorize([tokenize(text) for text in texts], urls)
+        scores = np.zeros((len(texts), len(self.fields)))
+        np.add.at(scores, rows, weights[:, None] * self.centroids[:, columns].T)
+        return scores
+
+    def classify_batch(self, texts, urls=None):
+        if not texts:
+            return []
+        scores = self.scores(texts, urls)
+        best = scores.argmax(axis=1)
+        confident = scores[np.arange(len(texts)), best] >= MIN_SCORE
+        return [self.fields[index] if ok else DEFAULT_FIELD for index, ok in zip(best, confident)]
+
+    def classify(self, text, url=None):
+        return self.classify_batch([text], [url])[0]
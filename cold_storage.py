@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Move stale crawl generations out of AcademicContent into compressed cold segments, and back
+
+The data APIs, downloads, statistics and analytics rollups read archived
+rows after the hot ones; only the /all-data browser and its facets are
+limited to the hot table.
+"""
+
+import gzip
+import json
+import logging
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app import create_app, db
+from db_utils import ensure_schema, insert_ignore_rows
+from facets import facet_cache
+from models import AcademicContent, ColdSegment, ArchivedKey
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_ROWS = 5000  # Rows per compressed segment; one segment is decoded at a time when reading
+DEFAULT_COLD_AFTER_DAYS = 180
+ARCHIVE_CURSOR_STRIDE = 10 ** 6  # Above any segment's row count, so cursors map back to one position
+COLUMNS = [column.name for column in AcademicContent.__table__.columns]
+
+
+def generation_of(crawled_at):
+    """Crawl generation label: the calendar month rows were (last) crawled in"""
+    return crawled_at.strftime('%Y-%m')
+
+
+def month_after(start):
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def encode_rows(rows):
+    """gzipped NDJSON of full column dicts; returns (payload, uncompressed size)"""
+    lines = []
+    for row in rows:
+        values = dict(row)
+        if values.get('crawled_at'):
+            values['crawled_at'] = values['crawled_at'].isoformat()
+        lines.append(json.dumps(values, ensure_ascii=False))
+    raw = ('\n'.join(lines) + '\n').encode('utf-8')
+    return gzip.compress(raw, compresslevel=6), len(raw)
+
+
+def decode_rows(payload):
+    rows = []
+    for line in gzip.decompress(payload).decode('utf-8').splitlines():
+        row = json.loads(line)
+        if row.get('crawled_at'):
+            row['crawled_at'] = datetime.fromisoformat(row['crawled_at'])
+        rows.append(row)
+    return rows
+
+
+def fill_segment(segment, rows):
+    """Set a segment's payload and the row counts kept beside it"""
+    payload, raw_bytes = encode_rows(rows)
+    ids = [row['id'] for row in rows]
+    segment.row_count = len(rows)
+    segment.min_id = min(ids)
+    segment.max_id = max(ids)
+    segment.field_counts = json.dumps(Counter(row['field'] for row in rows), ensure_ascii=False)
+    segment.type_counts = json.dumps(Counter(row['type'] for row in rows), ensure_ascii=False)
+    segment.raw_bytes = raw_bytes
+    segment.stored_bytes = len(payload)
+    segment.payload = payload
+
+
+def archive_segment(start, end):
+    """Move up to SEGMENT_ROWS rows crawled in [start, end) into one segment; returns it, or None
+
+    Postgres locks the rows while they are copied (FOR UPDATE). SQLite has
+    no row locks, so the delete repeats the crawled_at range: a row an upsert
+    refreshed after the copy no longer matches it, and the segment is rolled
+    back and built again without that row.
+    """
+    while True:
+        rows = db.session.execute(
+            db.select(*[getattr(AcademicContent, name) for name in COLUMNS])
+            .where(AcademicContent.crawled_at >= start, AcademicContent.crawled_at < end)
+            .order_by(AcademicContent.id)
+            .limit(SEGMENT_ROWS)
+            .with_for_update()
+        ).mappings().all()
+        if not rows:
+            return None
+
+        segment = ColdSegment(generation=generation_of(start))
+        fill_segment(segment, rows)
+        db.session.add(segment)
+        db.session.flush()
+        db.session.execute(db.insert(ArchivedKey), [
+            {'segment_id': segment.id, 'source_url': row['source_url'], 'content_hash': row['content_hash']}
+            for row in rows
+        ])
+        deleted = db.session.execute(db.delete(AcademicContent).where(
+            AcademicContent.id.in_([row['id'] for row in rows]),
+            AcademicContent.crawled_at >= start,
+            AcademicContent.crawled_at < end
+        )).rowcount
+        if deleted == len(rows):
+            db.session.commit()
+            return segment
+        db.session.rollback()
+        logger.info(f"{len(rows) - deleted} rows of {generation_of(start)} were refreshed while archiving, retrying")
+
+
+def archive_stale(cutoff, dry_run=False):
+    """Archive every row crawled before cutoff, oldest generation first
+
+    Archived rows stay in every read and in the rollups, so neither changes.
+    """
+    stats = Counter()
+    stale = AcademicContent.crawled_at < cutoff
+    if dry_run:
+        stats['rows'] = db.session.query(db.func.count(AcademicContent.id)).filter(stale).scalar()
+        return stats
+
+    while True:
+        oldest = db.session.query(db.func.min(AcademicContent.crawled_at)).filter(stale).scalar()
+        if oldest is None:
+            break
+        start = datetime(oldest.year, oldest.month, 1)
+        segment = archive_segment(start, min(month_after(start), cutoff))
+        if segment is None:
+            break
+        stats['segments'] += 1
+        stats['rows'] += segment.row_count
+        stats['raw_bytes'] += segment.raw_bytes
+        stats['stored_bytes'] += segment.stored_bytes
+        logger.info(f"Archived {segment.row_count} rows of {segment.generation} "
+                    f"({segment.raw_bytes} -> {segment.stored_bytes} bytes)")
+    if stats['rows']:
+        facet_cache.invalidate()
+    return stats
+
+
+def drop_archived_copies(rows):
+    """Remove the archived rows that newly stored rows replace; returns the removed rows
+
+    An archived row is replaced by a stored row with the same source URL (a
+    re-crawl of its page) or the same content hash, so no row is read from
+    both tiers. Affected segments are rewritten in the caller's transaction.
+    """
+    urls = {row['source_url'] for row in rows if row.get('source_url')}
+    hashes = {row['content_hash'] for row in rows if row.get('content_hash')}
+    if not urls and not hashes:
+        return []
+    replaced = db.or_(ArchivedKey.source_url.in_(urls), ArchivedKey.content_hash.in_(hashes))
+    segment_ids = sorted(set(db.session.execute(
+        db.select(ArchivedKey.segment_id).where(replaced)
+    ).scalars()))
+
+    removed = []
+    for segment_id in segment_ids:
+        segment = db.session.get(ColdSegment, segment_id, with_for_update=True)
+        if segment is None:
+            continue
+        kept = []
+        for row in decode_rows(segment.payload):
+            if row['source_url'] in urls or row['content_hash'] in hashes:
+                removed.append(row)
+            else:
+                kept.append(row)
+        if kept:
+            fill_segment(segment, kept)
+        else:
+            db.session.delete(segment)
+        db.session.execute(db.delete(ArchivedKey).where(ArchivedKey.segment_id == segment_id, replaced))
+    if removed:
+        logger.info(f"Dropped {len(removed)} archived rows replaced by newly stored rows")
+    return removed
+
+
+def index_archived_keys():
+    """Add the ArchivedKey rows of segments archived before that table existed; returns the segment count"""
+    unindexed = db.session.execute(
+        db.select(ColdSegment.id).where(~db.exists().where(ArchivedKey.segment_id == ColdSegment.id))
+    ).scalars().all()
+    for segment_id in unindexed:
+        segment = db.session.get(ColdSegment, segment_id)
+        db.session.execute(db.insert(ArchivedKey), [
+            {'segment_id': segment_id, 'source_url': row['source_url'], 'content_hash': row['content_hash']}
+            for row in decode_rows(segment.payload)
+        ])
+        db.session.commit()
+    return len(unindexed)
+
+
+def restore_generation(generation):
+    """Move a generation's rows back into AcademicContent; returns (restored, skipped)
+
+    Rows get new ids and the rollups already count them. A row whose content
+    hash a hot row holds anyway is dropped and taken out of the rollups.
+    """
+    from analytics import record_rows  # analytics imports this module to read the archive
+    restored = 0
+    skipped = 0
+    segment_ids = db.session.execute(
+        db.select(ColdSegment.id).where(ColdSegment.generation == generation).order_by(ColdSegment.id)
+    ).scalars().all()
+    for segment_id in segment_ids:
+        segment = db.session.get(ColdSegment, segment_id, with_for_update=True)
+        rows = decode_rows(segment.payload)
+        for row in rows:
+            row.pop('id', None)
+        inserted_rows = insert_ignore_rows(AcademicContent, rows, ['content_hash'], 'content_hash')
+        inserted_hashes = {row['content_hash'] for row in inserted_rows}
+        record_rows([row for row in rows if row['content_hash'] not in inserted_hashes], -1)
+        db.session.execute(db.delete(ArchivedKey).where(ArchivedKey.segment_id == segment_id))
+        db.session.delete(segment)
+        db.session.commit()
+        restored += len(inserted_rows)
+        skipped += len(rows) - len(inserted_rows)
+    if restored:
+        facet_cache.invalidate()
+    return restored, skipped
+
+
+def archive_cursor(position):
+    """Paging cursor for an archived (segment id, row index) position; negative, unlike hot row ids"""
+    segment_id, index = position
+    return -(segment_id * ARCHIVE_CURSOR_STRIDE + index + 1)
+
+
+def archive_position(cursor):
+    """(segment id, row index) of a cursor made by archive_cursor"""
+    return divmod(-cursor - 1, ARCHIVE_CURSOR_STRIDE)
+
+
+def archived_entries(generation=None, field=None, after=None):
+    """((segment id, row index), row) for archived rows in archive order, starting past position after
+
+    With field, segments whose field counts lack it are not decompressed.
+    """
+    query = db.select(ColdSegment.id, ColdSegment.field_counts).order_by(ColdSegment.id)
+    if generation:
+        query = query.where(ColdSegment.generation == generation)
+    if after:
+        query = query.where(ColdSegment.id >= after[0])
+    for segment_id, field_counts in db.session.execute(query).all():
+        if field and field not in json.loads(field_counts or '{}'):
+            continue
+        payload = db.session.execute(
+            db.select(ColdSegment.payload).where(ColdSegment.id == segment_id)
+        ).scalar()
+        if payload is None:
+            continue
+        first = after[1] + 1 if after and segment_id == after[0] else 0
+        rows = decode_rows(payload)
+        for index in range(first, len(rows)):
+            if not field or rows[index]['field'] == field:
+                yield (segment_id, index), rows[index]
+
+
+def iter_archived_rows(generation=None, field=None):
+    """Archived rows as column dicts, segment by segment in archive order"""
+    for _, row in archived_entries(generation, field):
+        yield row
+
+
+def archived_dict(row):
+    """An archived row in the to_dict() shape of the data APIs"""
+    item = {name: row.get(name) for name in AcademicContent.API_FIELDS}
+    for name in AcademicContent.JSON_FIELDS:
+        item[name] = json.loads(item[name]) if item[name] else []
+    return item
+
+
+def archive_summary():
+    """Archived row, field and type counts plus per-generation sizes, without reading payloads"""
+    summary = {'archived_items': 0, 'field_distribution': Counter(), 'type_distribution': Counter(),
+               'generations': {}}
+    segments = db.session.execute(
+        db.select(ColdSegment.generation, ColdSegment.row_count, ColdSegment.field_counts,
+                  ColdSegment.type_counts, ColdSegment.raw_bytes, ColdSegment.stored_bytes)
+        .order_by(ColdSegment.generation)
+    ).all()
+    for generation, row_count, field_counts, type_counts, raw_bytes, stored_bytes in segments:
+        summary['archived_items'] += row_count
+        summary['field_distribution'].update(json.loads(field_counts or '{}'))
+        summary['type_distribution'].update(json.loads(type_counts or '{}'))
+        entry = summary['generations'].setdefault(
+            generation, {'segments': 0, 'rows': 0, 'raw_bytes': 0, 'stored_bytes': 0})
+        entry['segments'] += 1
+        entry['rows'] += row_count
+        entry['raw_bytes'] += raw_bytes or 0
+        entry['stored_bytes'] += stored_bytes or 0
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    archive_parser = subparsers.add_parser('archive', help='archive rows crawled before a cutoff')
+    archive_parser.add_argument('--older-than-days', type=int, default=DEFAULT_COLD_AFTER_DAYS)
+    archive_parser.add_argument('--dry-run', action='store_true', help='count the rows that would be archived')
+    restore_parser = subparsers.add_parser('restore', help='move a generation back into the hot table')
+    restore_parser.add_argument('generation', help='YYYY-MM')
+    subparsers.add_parser('list', help='print archived generations')
+    export_parser = subparsers.add_parser('export', help='write archived rows as NDJSON')
+    export_parser.add_argument('output', help='output file')
+    export_parser.add_argument('--generation', help='YYYY-MM; all generations by default')
+    export_parser.add_argument('--field', help='only rows of this field')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        index_archived_keys()
+        if args.command == 'archive':
+            cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+            stats = archive_stale(cutoff, args.dry_run)
+            print(f"{'Would archive' if args.dry_run else 'Archived'} rows crawled before "
+                  f"{cutoff:%Y-%m-%d}: {dict(stats)}")
+        elif args.command == 'restore':
+            restored, skipped = restore_generation(args.generation)
+            print(f"Restored {restored} rows of {args.generation} ({skipped} already present)")
+        elif args.command == 'list':
+            for generation, entry in archive_summary()['generations'].items():
+                print(f"{generation} {entry['rows']:>9} rows {entry['segments']:>5} segments "
+                      f"{entry['raw_bytes'] / 2**20:>9.1f} MiB -> {entry['stored_bytes'] / 2**20:.1f} MiB")
+        elif args.command == 'export':
+            exported = 0
+            with open(args.output, 'w', encoding='utf-8') as f:
+                for row in iter_archived_rows(args.generation, args.field):
+                    if row.get('crawled_at'):
+                        row['crawled_at'] = row['crawled_at'].isoformat()
+                    f.write(json.dumps(row, ensure_ascii=False) + '\n')
+                    exported += 1
+            print(f"Exported {exported} archived rows to {args.output}")
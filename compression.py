@@ -0,0 +1,170 @@
+"""
+WSGI middleware that gzip/brotli-compresses text responses, including streamed ones
+"""
+
+import zlib
+import logging
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MIN_SIZE = 1024  # Bodies known to be smaller than this are sent as-is
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Higher qualities cost far more CPU for little gain on JSON
+FLUSH_BYTES = 32 * 1024  # Input between flushes of a streamed body
+
+
+def accepted_encodings(header):
+    """{encoding: q} from an Accept-Encoding header"""
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header):
+    encodings = accepted_encodings(header or '')
+    wildcard = encodings.get('*', 0.0)
+    candidates = (['br'] if brotli else []) + ['gzip']
+    best = None
+    best_q = 0.0
+    for name in candidates:
+        q = encodings.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class GzipStream:
+    def __init__(self):
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, chunk):
+        return self.compressor.compress(chunk)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, chunk):
+        return self.compressor.process(chunk)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+STREAMS = {'gzip': GzipStream, 'br': BrotliStream}
+
+
+def add_vary(headers):
+    """headers with Accept-Encoding merged into a single Vary header"""
+    vary = []
+    for name, value in headers:
+        if name.lower() == 'vary':
+            vary.extend(part.strip() for part in value.split(',') if part.strip())
+    if not any(part.lower() == 'accept-encoding' for part in vary):
+        vary.append('Accept-Encoding')
+    headers = [(name, value) for name, value in headers if name.lower() != 'vary']
+    headers.append(('Vary', ', '.join(vary)))
+    return headers
+
+
+class CompressionMiddleware:
+    """Negotiates gzip or brotli and compresses the body as the app yields it
+
+    Chunks from a streamed response are compressed as they arrive and
+    flushed every FLUSH_BYTES of input, so /download_json starts sending
+    immediately instead of being buffered. Responses that are small,
+    already encoded or not text are passed through untouched.
+    """
+
+    def __init__(self, app, min_size=MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    def __call__(self, environ, start_response):
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            encoding = None
+
+        state = {}
+
+        def compressing_start_response(status, headers, exc_info=None):
+            if not self.is_compressible_type(headers):
+                return start_response(status, headers, exc_info)
+            # Every variant of a compressible response depends on Accept-Encoding,
+            # including the identity one, or shared caches could serve gzip to anyone
+            headers = add_vary(headers)
+            if encoding and self.should_compress(status, headers):
+                headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+                headers.append(('Content-Encoding', encoding))
+                state['stream'] = STREAMS[encoding]()
+            return start_response(status, headers, exc_info)
+
+        body = self.app(environ, compressing_start_response)
+        return self.compress_body(body, state)
+
+    def is_compressible_type(self, headers):
+        for name, value in headers:
+            if name.lower() == 'content-type':
+                return value.lower().startswith(COMPRESSIBLE_TYPES)
+        return False
+
+    def should_compress(self, status, headers):
+        if not status.startswith('2') or status.startswith('204'):
+            return False
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == 'content-encoding':
+                return False
+            if lowered == 'content-length' and value.isdigit() and int(value) < self.min_size:
+                return False
+        return True
+
+    def compress_body(self, body, state):
+        pending = 0
+        try:
+            for chunk in body:
+                stream = state.get('stream')
+                if stream is None:
+                    yield chunk
+                    continue
+                data = stream.compress(chunk)
+                pending += len(chunk)
+                # Flushing every small chunk would cost ratio; flushing never would stall the stream
+                if pending >= FLUSH_BYTES:
+                    data += stream.flush()
+                    pending = 0
+                if data:
+                    yield data
+            if state.get('stream') is not None:
+                yield state['stream'].finish()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
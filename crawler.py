@@ -1,78 +1,226 @@
 import requests
 from bs4 import BeautifulSoup
 import trafilatura
+import os
 import time
-import random
+import threading
+from collections import OrderedDict
 from urllib.parse import urljoin, urlparse
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import re
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from academic_sources import ACADEMIC_SOURCES, EDU_DOMAINS, ORG_DOMAINS, FIELD_KEYWORDS
+from url_filter import UrlFilter, canonicalize_url
+from extractor import StructuredExtractor
+from extraction_plans import ExtractionPlans
+from host_throttle import HostThrottle, THROTTLE_STATUSES, backoff_delay
+from downloader import PageDownloader, ACCEPT_ENCODING, DEFAULT_MAX_BYTES
+from link_priority import FieldQuota, LinkScorer, BestFirstQueue
+from fingerprint import text_hash, record_hash
 
 logger = logging.getLogger(__name__)
 
+STORED_BODY_CACHE = int(os.environ.get('STORED_BODY_CACHE', 100000))
+
+# Keywords are lowered once here rather than for every classified page
+FIELD_KEYWORDS_LOWER = {
+    field: [keyword.lower() for keyword in keywords]
+    for field, keywords in FIELD_KEYWORDS.items()
+}
+
+class StoredBodies:
+    """Whether a page body is already stored, from AcademicContent.body_hash behind a bounded LRU
+
+    Safe to call from any thread: each lookup that misses the cache runs in
+    its own app context.
+    """
+    
+    def __init__(self, app, max_entries=STORED_BODY_CACHE):
+        self.app = app
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'lookups': 0, 'stored': 0}
+    
+    def contains(self, body_hash):
+        with self.lock:
+            if body_hash in self.entries:
+                self.entries.move_to_end(body_hash)
+                self.stats['hits'] += 1
+                return self.entries[body_hash]
+        
+        from app import db
+        from models import AcademicContent
+        with self.app.app_context():
+            stored = db.session.execute(
+                db.select(AcademicContent.id).where(AcademicContent.body_hash == body_hash).limit(1)
+            ).first() is not None
+        
+        with self.lock:
+            self.stats['lookups'] += 1
+            self.stats['stored'] += stored
+            self.entries[body_hash] = stored
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return stored
+    
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, entries=len(self.entries))
+
 class AcademicCrawler:
-    def __init__(self, max_workers=5, delay_range=(1, 3)):
+    def __init__(self, max_workers=5, delay_range=(1, 3), max_host_workers=20, max_retries=3,
+                 max_page_bytes=DEFAULT_MAX_BYTES, archive=None, app=None):
         self.max_workers = max_workers
         self.delay_range = delay_range
+        self.max_host_workers = max_host_workers
+        self.max_retries = max_retries
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.1',
+            'Accept-Encoding': ACCEPT_ENCODING
         })
         self.crawled_urls = set()
         self.extracted_data = []
+        self.url_filter = UrlFilter()
+        self.extractor = StructuredExtractor(classifier=self.classify_content_field)
+        self.extraction_plans = ExtractionPlans()
+        # Raw responses go to the WARC archive, if any, so pages can be re-extracted offline
+        self.downloader = PageDownloader(max_bytes=max_page_bytes, archive=archive)
+        self.seen_bodies = set()
+        self.seen_bodies_lock = threading.Lock()
+        self.duplicate_bodies = 0
+        # Bodies stored by earlier crawls; without an app only this crawl's bodies are known
+        self.stored_bodies = StoredBodies(app) if app else None
+        # Items per field so far; link priorities favour fields furthest below their share
+        self.field_quota = FieldQuota()
+        self.pages_fetched = 0
+        # max_workers is the starting per-host limit; each host adapts from there
+        self.throttle = HostThrottle(
+            initial_limit=max_workers,
+            max_limit=max_host_workers,
+            delay_range=delay_range
+        )
+        
+    def fetch(self, url, headers=None):
+        """GET a URL under its host's controller, retrying with jittered backoff"""
+        controller = self.throttle.for_url(url)
         
+        for attempt in range(self.max_retries + 1):
+            controller.wait_turn()
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, timeout=30, stream=True, headers=headers)
+            except requests.Timeout:
+                controller.record(None, 'throttled')
+                if attempt == self.max_retries:
+                    raise
+            except requests.ConnectionError:
+                controller.record(None, 'error')
+                if attempt == self.max_retries:
+                    raise
+            else:
+                latency = time.monotonic() - start
+                if response.status_code in THROTTLE_STATUSES:
+                    controller.record(latency, 'throttled')
+                    retry_after = response.headers.get('Retry-After', '')
+                    if retry_after.isdigit():
+                        controller.pause(int(retry_after))
+                elif response.status_code >= 500:
+                    controller.record(latency, 'error')
+                else:
+                    # Client errors such as 404 say nothing about the host's health
+                    controller.record(latency, 'ok')
+                    response.raise_for_status()
+                    return response
+                
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                response.close()
+            
+            delay = backoff_delay(attempt)
+            logger.debug(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+    
     def get_page_content(self, url):
         """Extract clean text content from a webpage"""
+        controller = self.throttle.for_url(url)
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # Use trafilatura for clean text extraction
-            text_content = trafilatura.extract(response.text)
+            response = self.fetch(url)
             
-            # Also parse with BeautifulSoup for structured data
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Stream the body; non-HTML and oversized responses are dropped unread
+            html = self.downloader.read(response)
+            if html is None:
+                return None
             
-            return {
-                'text': text_content,
-                'soup': soup,
-                'url': url
-            }
+            return self.parse_html(url, html)
         except Exception as e:
             logger.error(f"Error fetching {url}: {e}")
             return None
+        finally:
+            controller.release()
+    
+    def parse_html(self, url, html):
+        """Build the content data for a downloaded page"""
+        # Parse with BeautifulSoup for structured data
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # Known sources go through their configured selectors first
+        plan = self.extraction_plans.for_url(url)
+        planned = plan.extract(soup, url) if plan else None
+        if planned:
+            return {
+                'text': planned['text'],
+                'soup': soup,
+                'url': url,
+                'title': planned['title'],
+                'field': planned['field']
+            }
+        
+        # Fall back to trafilatura for clean text extraction
+        text_content = trafilatura.extract(html)
+        
+        return {
+            'text': text_content,
+            'soup': soup,
+            'url': url
+        }
     
-    def extract_links(self, soup, base_url, domain_filter=None):
-        """Extract relevant links from a page"""
+    def extract_links(self, soup, base_url, domain_filter=None, seen=None, with_anchors=False):
+        """Extract relevant links from a page as canonical URLs, or (URL, anchor text) pairs"""
         links = []
+        page_seen = set()
+        if seen is None:
+            seen = self.crawled_urls
+        
         for link in soup.find_all('a', href=True):
-            href = link['href']
-            full_url = urljoin(base_url, href)
+            full_url = urljoin(base_url, link['href'])
             
-            # Filter by domain if specified
-            if domain_filter and domain_filter not in full_url:
-                continue
-                
-            # Skip common non-content URLs
-            if any(skip in full_url.lower() for skip in ['login', 'register', 'contact', 'privacy', 'terms']):
+            # Canonicalize and drop off-host, non-HTML, skipped and already seen URLs
+            canonical = self.url_filter.check(full_url, domain_filter, seen, page_seen)
+            if not canonical:
                 continue
-                
-            links.append(full_url)
+            
+            page_seen.add(canonical)
+            if with_anchors:
+                links.append((canonical, link.get_text(' ', strip=True) or link.get('title', '')))
+            else:
+                links.append(canonical)
         
-        return list(set(links))  # Remove duplicates
+        return links
     
-    def classify_content_field(self, text, url):
+    def classify_content_field(self, text, url, text_lower=None):
         """Classify content into scientific fields based on keywords"""
-        text_lower = text.lower() if text else ""
+        if text_lower is None:
+            text_lower = text.lower() if text else ""
         url_lower = url.lower()
         
         field_scores = {}
-        for field, keywords in FIELD_KEYWORDS.items():
+        for field, keywords in FIELD_KEYWORDS_LOWER.items():
             score = 0
             for keyword in keywords:
-                score += text_lower.count(keyword.lower())
-                if keyword.lower() in url_lower:
+                score += text_lower.count(keyword)
+                if keyword in url_lower:
                     score += 5  # URL match gets higher weight
             field_scores[field] = score
         
@@ -81,130 +229,113 @@ class AcademicCrawler:
             return max(field_scores, key=field_scores.get)
         return 'علوم عامة'
     
-    def extract_structured_data(self, content_data):
-        """Extract structured academic data from page content"""
+    def is_duplicate_body(self, content_data):
+        """True if a page with the same normalized text was seen in this crawl or is already stored"""
         if not content_data or not content_data['text']:
-            return None
-            
-        text = content_data['text']
-        soup = content_data['soup']
-        url = content_data['url']
-        
-        # Extract title
-        title = None
-        for selector in ['h1', 'title', '.title', '.page-title']:
-            title_elem = soup.select_one(selector)
-            if title_elem:
-                title = title_elem.get_text().strip()
-                break
-        
-        if not title:
-            title = "محتوى علمي"
-        
-        # Classify field
-        field = self.classify_content_field(text, url)
-        
-        # Extract key information using regex patterns
-        dates = re.findall(r'\b(19|20)\d{2}\b', text)
-        
-        # Extract names (simple pattern for common academic names)
-        names = re.findall(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', text)
-        key_people = list(set(names[:5]))  # Limit to 5 unique names
-        
-        # Create summary (first meaningful paragraph)
-        sentences = text.split('.')
-        summary = ""
-        for sentence in sentences:
-            if len(sentence.strip()) > 50 and not sentence.strip().startswith(('http', 'www')):
-                summary = sentence.strip()
-                break
-        
-        # Extract facts (sentences with specific patterns)
-        facts = []
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if any(pattern in sentence.lower() for pattern in ['discovered', 'invented', 'theory', 'law', 'principle']):
-                if len(sentence) > 20 and len(sentence) < 200:
-                    facts.append(sentence)
-                    if len(facts) >= 3:
-                        break
-        
-        # Determine content type
-        content_type = "معلومة علمية"
-        if any(word in text.lower() for word in ['theory', 'theorem']):
-            content_type = "نظرية علمية"
-        elif any(word in text.lower() for word in ['experiment', 'study']):
-            content_type = "تجربة علمية"
-        elif any(word in text.lower() for word in ['discovery', 'invention']):
-            content_type = "اكتشاف علمي"
-        
-        return {
-            'type': content_type,
-            'title': title[:200],  # Limit title length
-            'field': field,
-            'date': dates[0] if dates else "",
-            'location': "",  # Could be enhanced with location extraction
-            'key_people': key_people,
-            'summary': summary[:500] if summary else text[:500],  # Limit summary length
-            'verified_facts': facts
-        }
+            return False
+        content_data['body_hash'] = text_hash(content_data['text'])
+        return self.is_known_body(content_data['body_hash'])
     
-    def crawl_domain(self, domain, max_pages=100):
-        """Crawl a specific academic domain"""
+    def is_known_body(self, body_hash):
+        if body_hash is None:
+            return False
+        with self.seen_bodies_lock:
+            if body_hash in self.seen_bodies:
+                self.duplicate_bodies += 1
+                return True
+            self.seen_bodies.add(body_hash)
+        if self.stored_bodies and self.stored_bodies.contains(body_hash):
+            with self.seen_bodies_lock:
+                self.duplicate_bodies += 1
+            return True
+        return False
+    
+    def extract_structured_data(self, content_data):
+        """Extract structured academic data from page content, tagged with the page's body hash"""
+        record = self.extractor.extract(content_data)
+        if record and content_data.get('text'):
+            record.body_hash = content_data.get('body_hash') or text_hash(content_data['text'])
+        return record
+    
+    def seed_urls(self, domain):
+        """Canonical starting URLs for a domain"""
         if domain in ACADEMIC_SOURCES:
-            source_config = ACADEMIC_SOURCES[domain]
-            urls_to_crawl = source_config['base_urls'].copy()
+            urls = ACADEMIC_SOURCES[domain]['base_urls']
         else:
             # For .edu and .org domains, start with common academic paths
             base_url = f"https://{domain}"
-            urls_to_crawl = [
+            urls = [
                 f"{base_url}/research",
                 f"{base_url}/academics",
                 f"{base_url}/departments",
                 f"{base_url}/science",
                 f"{base_url}/publications"
             ]
+        return [canonicalize_url(url) for url in urls]
+    
+    def crawl_domain(self, domain, max_pages=100):
+        """Crawl a specific academic domain, best-scoring links first"""
+        frontier = BestFirstQueue(LinkScorer(self.field_quota, self.extraction_plans))
+        seeds = self.seed_urls(domain)
+        for url in seeds:
+            frontier.add(url)
         
         crawled_count = 0
         domain_data = []
+        queued_urls = set(self.crawled_urls)  # Everything already fetched or waiting in the queue
+        queued_urls.update(seeds)
+        pending = {}
         
-        while urls_to_crawl and crawled_count < max_pages:
-            current_batch = urls_to_crawl[:self.max_workers]
-            urls_to_crawl = urls_to_crawl[self.max_workers:]
-            
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                future_to_url = {executor.submit(self.get_page_content, url): url for url in current_batch}
-                
-                for future in as_completed(future_to_url):
-                    url = future_to_url[future]
+        with ThreadPoolExecutor(max_workers=self.max_host_workers) as executor:
+            while (frontier or pending) and crawled_count < max_pages:
+                # Submit as many URLs as their hosts' current limits allow
+                while frontier and crawled_count + len(pending) < max_pages:
+                    url, depth = frontier.peek()
                     if url in self.crawled_urls:
+                        frontier.pop()
                         continue
-                        
+                    if not self.throttle.for_url(url).try_acquire():
+                        break
+                    frontier.pop()
+                    pending[executor.submit(self.get_page_content, url)] = (url, depth)
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = pending.pop(future)
+                    
                     try:
                         content_data = future.result()
                         if content_data:
                             self.crawled_urls.add(url)
+                            self.pages_fetched += 1
                             crawled_count += 1
                             
-                            # Extract structured data
-                            structured_data = self.extract_structured_data(content_data)
-                            if structured_data:
-                                domain_data.append(structured_data)
+                            # Extract structured data unless another URL served the same body
+                            if not self.is_duplicate_body(content_data):
+                                structured_data = self.extract_structured_data(content_data)
+                                if structured_data:
+                                    domain_data.append(structured_data)
+                                    self.field_quota.add(structured_data.field)
                             
-                            # Extract more links for recursive crawling
-                            if crawled_count < max_pages * 0.8:  # Stop finding new links when close to limit
-                                new_links = self.extract_links(content_data['soup'], url, domain)
-                                for link in new_links[:10]:  # Limit new links per page
-                                    if link not in self.crawled_urls and link not in urls_to_crawl:
-                                        urls_to_crawl.append(link)
+                            # Every new link is queued; the frontier decides which are worth the budget
+                            new_links = self.extract_links(content_data['soup'], url, domain, seen=queued_urls,
+                                                           with_anchors=True)
+                            for link, anchor in new_links:
+                                queued_urls.add(link)
+                                # Dropped links may be queued again if found from a better page
+                                queued_urls.difference_update(frontier.add(link, anchor, depth + 1))
                             
                             logger.info(f"Crawled {crawled_count}/{max_pages} pages from {domain}")
                             
                     except Exception as e:
                         logger.error(f"Error processing {url}: {e}")
-                    
-                    # Random delay between requests
-                    time.sleep(random.uniform(*self.delay_range))
+            
+            for future, (url, _) in pending.items():
+                if future.cancel():
+                    self.throttle.for_url(url).release()
         
         return domain_data
     
@@ -215,6 +346,7 @@ class AcademicCrawler:
         # Calculate pages per domain to reach target
         total_domains = len(ACADEMIC_SOURCES) + len(EDU_DOMAINS) + len(ORG_DOMAINS)
         pages_per_domain = max(50, target_count // (total_domains * 3))  # Estimate 3 items per page
+        self.field_quota.set_target(target_count)
         
         logger.info(f"Starting crawl with target of {target_count} items")
         logger.info(f"Estimated {pages_per_domain} pages per domain")
@@ -253,17 +385,31 @@ class AcademicCrawler:
         unique_data = self.remove_duplicates(all_data)
         
         logger.info(f"Final count: {len(unique_data)} unique items")
+        logger.info(f"URL filter stats: {self.url_filter.get_stats()}")
+        logger.info(f"Extraction plan stats: {self.extraction_plans.get_stats()}")
+        logger.info(f"Download stats: {self.downloader.get_stats()}")
+        logger.info(f"Duplicate page bodies skipped before extraction: {self.duplicate_bodies}")
+        if self.stored_bodies:
+            logger.info(f"Stored body lookups: {self.stored_bodies.get_stats()}")
+        if self.pages_fetched:
+            logger.info(f"Items per page fetched: {len(all_data) / self.pages_fetched:.2f} "
+                        f"({len(all_data)} items from {self.pages_fetched} pages)")
+        logger.info(f"Items per field: {self.field_quota.get_stats()}")
         return unique_data
     
     def remove_duplicates(self, data):
-        """Remove duplicate entries based on title similarity"""
+        """Remove duplicate entries based on title similarity or identical content"""
         unique_data = []
         seen_titles = set()
+        seen_hashes = set()
         
         for item in data:
-            title_key = item['title'].lower().strip()[:100]  # Use first 100 chars for comparison
-            if title_key not in seen_titles:
+            title_key = item.title.lower().strip()[:100]  # Use first 100 chars for comparison
+            content_key = record_hash(item.summary, item.verified_facts)
+            if title_key not in seen_titles and content_key not in seen_hashes:
                 seen_titles.add(title_key)
+                seen_hashes.add(content_key)
+                item.content_hash = content_key
                 unique_data.append(item)
         
         return unique_data
@@ -3,8 +3,10 @@
 
 import json
 import logging
-from app import app, db
+from app import create_app, db
 from models import AcademicContent
+from db_utils import ensure_schema
+from analytics import rebuild_rollups
 from datetime import datetime
 
 # Sample academic data in the exact format requested
@@ -163,7 +165,9 @@ sample_data = [
 
 def create_sample_data():
     """Create sample academic data in the database"""
+    app = create_app()
     with app.app_context():
+        ensure_schema()
         try:
             # Clear existing data
             AcademicContent.query.delete()
@@ -186,6 +190,7 @@ def create_sample_data():
             
             db.session.commit()
             print(f"Successfully created {len(sample_data)} sample academic records")
+            rebuild_rollups()
             
         except Exception as e:
             print(f"Error creating sample data: {e}")
@@ -1,64 +1,116 @@
 import json
 import logging
+from collections import Counter
 from models import AcademicContent, CrawlStatus
 from app import db
 from datetime import datetime
+from db_utils import insert_ignore_rows
+from fingerprint import record_hash
+from records import AcademicRecord
+from facets import facet_cache
+from suggest import suggest_index
+from analytics import record_rows, row_deltas, apply_deltas
+from cold_storage import (archive_summary, archived_dict, archived_entries, archive_cursor,
+                          archive_position, drop_archived_copies)
 
 logger = logging.getLogger(__name__)
 
+# Items checked against the database per round trip
+SAVE_BATCH_SIZE = 500
+
 class DataProcessor:
     def __init__(self):
-        pass
+        self.skipped = {'content_hash': 0, 'title_field': 0}
+    
+    def item_to_row(self, item):
+        """Column values for one extracted record (or legacy dict), including its content hash"""
+        if not isinstance(item, AcademicRecord):
+            item = AcademicRecord.from_dict(item)
+        return {
+            'type': item.type,
+            'title': item.title,
+            'field': item.field,
+            'date': item.date,
+            'location': item.location,
+            'key_people': json.dumps(item.key_people, ensure_ascii=False),
+            'summary': item.summary,
+            'verified_facts': json.dumps(item.verified_facts, ensure_ascii=False),
+            'source_url': item.source_url,
+            'crawled_at': datetime.utcnow(),
+            'content_hash': item.content_hash or record_hash(item.summary, item.verified_facts),
+            'body_hash': item.body_hash
+        }
+    
+    def filter_new_rows(self, rows, seen_hashes, seen_titles):
+        """Drop rows whose content hash or (title, field) is already stored or seen in this save"""
+        hashes = [row['content_hash'] for row in rows]
+        existing_hashes = set(db.session.execute(
+            db.select(AcademicContent.content_hash).where(AcademicContent.content_hash.in_(hashes))
+        ).scalars())
+        
+        title_keys = list({(row['title'], row['field']) for row in rows})
+        existing_titles = set(db.session.execute(
+            db.select(AcademicContent.title, AcademicContent.field)
+            .where(db.tuple_(AcademicContent.title, AcademicContent.field).in_(title_keys))
+        ).tuples())
+        
+        new_rows = []
+        for row in rows:
+            title_key = (row['title'], row['field'])
+            if row['content_hash'] in existing_hashes or row['content_hash'] in seen_hashes:
+                self.skipped['content_hash'] += 1
+                continue
+            if title_key in existing_titles or title_key in seen_titles:
+                self.skipped['title_field'] += 1
+                continue
+            seen_hashes.add(row['content_hash'])
+            seen_titles.add(title_key)
+            new_rows.append(row)
+        return new_rows
+    
+    def insert_batch(self, rows, seen_hashes, seen_titles):
+        new_rows = self.filter_new_rows(rows, seen_hashes, seen_titles)
+        # The unique content_hash index still drops rows another writer inserted meanwhile
+        inserted_rows = insert_ignore_rows(AcademicContent, new_rows, ['content_hash'], 'content_hash')
+        if inserted_rows:
+            # Same transaction, so the rollups only ever count committed rows
+            record_rows(inserted_rows)
+            record_rows(drop_archived_copies(inserted_rows), -1)
+        db.session.commit()
+        if inserted_rows:
+            facet_cache.invalidate()
+            suggest_index.add_rows(inserted_rows)
+        return len(inserted_rows)
     
     def save_to_database(self, crawled_data, source_domain="multiple"):
         """Save crawled data to database"""
         saved_count = 0
         errors = []
+        seen_hashes = set()
+        seen_titles = set()
         
         try:
+            batch = []
             for item in crawled_data:
                 try:
-                    # Check if item already exists
-                    existing = AcademicContent.query.filter_by(
-                        title=item['title'],
-                        field=item['field']
-                    ).first()
-                    
-                    if existing:
-                        continue  # Skip duplicates
-                    
-                    academic_content = AcademicContent(
-                        type=item['type'],
-                        title=item['title'],
-                        field=item['field'],
-                        date=item.get('date', ''),
-                        location=item.get('location', ''),
-                        key_people=json.dumps(item.get('key_people', []), ensure_ascii=False),
-                        summary=item['summary'],
-                        verified_facts=json.dumps(item.get('verified_facts', []), ensure_ascii=False),
-                        source_url=item.get('source_url', ''),
-                        crawled_at=datetime.utcnow()
-                    )
-                    
-                    db.session.add(academic_content)
-                    saved_count += 1
-                    
-                    # Commit in batches
-                    if saved_count % 100 == 0:
-                        db.session.commit()
-                        logger.info(f"Saved {saved_count} items so far")
-                        
+                    batch.append(self.item_to_row(item))
                 except Exception as e:
                     errors.append(f"Error saving item '{item.get('title', 'Unknown')}': {e}")
                     logger.error(f"Error saving item: {e}")
+                
+                # Check duplicates and insert in batches
+                if len(batch) >= SAVE_BATCH_SIZE:
+                    saved_count += self.insert_batch(batch, seen_hashes, seen_titles)
+                    batch = []
+                    logger.info(f"Saved {saved_count} items so far")
             
-            # Final commit
-            db.session.commit()
+            if batch:
+                saved_count += self.insert_batch(batch, seen_hashes, seen_titles)
             
             # Update crawl status
             self.update_crawl_status(source_domain, saved_count, "completed")
             
-            logger.info(f"Successfully saved {saved_count} items to database")
+            logger.info(f"Successfully saved {saved_count} items to database (skipped duplicates: {self.skipped})")
             
         except Exception as e:
             db.session.rollback()
@@ -68,6 +120,46 @@ class DataProcessor:
         
         return saved_count, errors
     
+    def upsert_by_source_url(self, items):
+        """Update the rows of re-fetched pages in place, inserting pages seen for the first time"""
+        updated = 0
+        inserted = 0
+        replaced = []
+        current = []
+        for item in items:
+            values = self.item_to_row(item)
+            source_url = values.pop('source_url')
+            
+            # Another page may already hold this exact body
+            duplicate = AcademicContent.query.filter(
+                AcademicContent.content_hash == values['content_hash'],
+                AcademicContent.source_url != source_url
+            ).first()
+            if duplicate:
+                self.skipped['content_hash'] += 1
+                continue
+            
+            existing = AcademicContent.query.filter_by(source_url=source_url).first()
+            if existing:
+                replaced.append({'field': existing.field, 'date': existing.date,
+                                 'location': existing.location, 'key_people': existing.key_people})
+                for key, value in values.items():
+                    setattr(existing, key, value)
+                updated += 1
+            else:
+                db.session.add(AcademicContent(source_url=source_url, **values))
+                inserted += 1
+            current.append(dict(values, source_url=source_url))
+        
+        # Old values out, including archived copies of these pages, new values in; unchanged rows cancel out
+        deltas = row_deltas(replaced, -1)
+        row_deltas(drop_archived_copies(current), -1, deltas)
+        apply_deltas(row_deltas(current, 1, deltas))
+        db.session.commit()
+        if updated or inserted:
+            facet_cache.invalidate()
+        return updated, inserted
+    
     def update_crawl_status(self, domain, item_count, status, error_message=None):
         """Update or create crawl status record"""
         try:
@@ -95,15 +187,59 @@ class DataProcessor:
             db.session.rollback()
     
     def get_all_data_as_json(self):
-        """Retrieve all academic content as JSON"""
+        """Retrieve all academic content as JSON, archived rows last"""
         try:
             all_content = AcademicContent.query.all()
             json_data = [item.to_dict() for item in all_content]
+            json_data.extend(archived_dict(row) for _, row in archived_entries())
             return json_data
         except Exception as e:
             logger.error(f"Error retrieving data as JSON: {e}")
             return []
     
+    def get_projected_data(self, fields=None, field_filter=None, limit=None, after_id=None):
+        """Rows as dicts of the requested API fields only, in id order, plus the next cursor
+
+        Only the requested columns are selected and only requested JSON
+        columns are decoded. Archived rows follow the hot ones. With a limit,
+        the cursor is the last id returned, or a negative archive position
+        once the pages reach the archive (None on the last page), and is
+        passed back as after_id.
+        """
+        fields = list(fields or AcademicContent.API_FIELDS)
+        decoders = [(index + 1, name, name in AcademicContent.JSON_FIELDS) for index, name in enumerate(fields)]
+        items = []
+        
+        if after_id is None or after_id >= 0:
+            statement = db.select(AcademicContent.id, *[getattr(AcademicContent, name) for name in fields])
+            if field_filter:
+                statement = statement.where(AcademicContent.field == field_filter)
+            if after_id:
+                statement = statement.where(AcademicContent.id > after_id)
+            statement = statement.order_by(AcademicContent.id)
+            if limit:
+                statement = statement.limit(limit)
+            
+            last_id = None
+            for row in db.session.execute(statement):
+                last_id = row[0]
+                items.append({
+                    name: (json.loads(row[index]) if row[index] else []) if is_json else row[index]
+                    for index, name, is_json in decoders
+                })
+            if limit and len(items) == limit:
+                return items, last_id
+        
+        after = archive_position(after_id) if after_id and after_id < 0 else None
+        for position, row in archived_entries(field=field_filter, after=after):
+            items.append({
+                name: (json.loads(row[name]) if row[name] else []) if is_json else row[name]
+                for _, name, is_json in decoders
+            })
+            if limit and len(items) == limit:
+                return items, archive_cursor(position)
+        return items, None
+    
     def get_statistics(self):
         """Get crawling and data statistics"""
         try:
@@ -121,13 +257,21 @@ class DataProcessor:
                 db.func.count(AcademicContent.id)
             ).group_by(AcademicContent.type).all()
             
+            # Archived rows are still part of the corpus
+            archive = archive_summary()
+            field_distribution = Counter(dict(field_counts))
+            field_distribution.update(archive['field_distribution'])
+            type_distribution = Counter(dict(type_counts))
+            type_distribution.update(archive['type_distribution'])
+            
             # Get crawl status
             crawl_statuses = CrawlStatus.query.all()
             
             return {
-                'total_items': total_items,
-                'field_distribution': dict(field_counts),
-                'type_distribution': dict(type_counts),
+                'total_items': total_items + archive['archived_items'],
+                'archived_items': archive['archived_items'],
+                'field_distribution': dict(field_distribution),
+                'type_distribution': dict(type_distribution),
                 'crawl_statuses': [
                     {
                         'domain': status.source_domain,
@@ -139,7 +283,7 @@ class DataProcessor:
             }
         except Exception as e:
             logger.error(f"Error getting statistics: {e}")
-            return {'total_items': 0, 'field_distribution': {}, 'type_distribution': {}, 'crawl_statuses': []}
+            return {'total_items': 0, 'archived_items': 0, 'field_distribution': {}, 'type_distribution': {}, 'crawl_statuses': []}
     
     def export_sample_data(self, limit=10):
         """Export a sample of data for demonstration"""
@@ -0,0 +1,85 @@
+"""
+Database helpers shared by the ingest, crawl and maintenance code
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_schema():
+    """Create missing tables, then add columns and indexes that older databases lack
+
+    create_all only creates whole tables, so columns added to an existing model
+    are applied here with ALTER TABLE. Index creation that fails (e.g. a unique
+    index over rows that still hold duplicates) is logged and retried next time.
+    """
+    db.create_all(bind_key=None)  # Never create tables on the read replica
+    inspector = inspect(db.engine)
+
+    for table in db.metadata.sorted_tables:
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            try:
+                index.create(db.engine)
+                logger.info(f"Created index {index.name}")
+            except Exception as e:
+                logger.warning(f"Could not create index {index.name}: {e}")
+
+
+def insert_ignore(model, rows, index_elements):
+    """Bulk insert rows, silently skipping those that hit a unique constraint
+
+    Returns the number of rows actually inserted where the driver reports it.
+    """
+    if not rows:
+        return 0
+
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    else:
+        statement = db.insert(model).prefix_with('IGNORE')
+
+    # Core execution on the session's connection keeps the driver rowcount
+    result = db.session.connection().execute(statement, rows)
+    return max(result.rowcount, 0)
+
+
+def insert_ignore_rows(model, rows, index_elements, key):
+    """Like insert_ignore, but returns the rows that were actually inserted
+
+    Rows are matched back through INSERT ... RETURNING of their key column,
+    so rows dropped by a unique constraint (e.g. inserted meanwhile by another
+    writer) are left out. Dialects without RETURNING get every row back.
+    """
+    if not rows:
+        return []
+
+    dialect = db.engine.dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        insert_ignore(model, rows, index_elements)
+        return rows
+
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    statement = insert(model).on_conflict_do_nothing(index_elements=index_elements).returning(getattr(model, key))
+    inserted = set(db.session.connection().execute(statement, rows).scalars())
+    return [row for row in rows if row[key] in inserted]
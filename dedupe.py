@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Backfill AcademicContent.content_hash and drop rows whose body is already stored"""
+
+import json
+import argparse
+
+from app import create_app, db
+from models import AcademicContent
+from db_utils import ensure_schema
+from fingerprint import record_hash
+from analytics import rebuild_rollups
+
+
+def backfill_content_hashes(chunk_size=1000, delete_duplicates=False):
+    """Hash rows that have no content_hash yet, oldest first
+
+    A row whose hash already belongs to an older row is a duplicate: it is
+    deleted with delete_duplicates, otherwise left without a hash.
+    """
+    hashed = 0
+    duplicates = 0
+    last_id = 0
+
+    while True:
+        rows = AcademicContent.query.filter(
+            AcademicContent.id > last_id,
+            AcademicContent.content_hash.is_(None)
+        ).order_by(AcademicContent.id).limit(chunk_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        row_hashes = [
+            (row, record_hash(row.summary, json.loads(row.verified_facts) if row.verified_facts else []))
+            for row in rows
+        ]
+        existing = set(db.session.execute(
+            db.select(AcademicContent.content_hash)
+            .where(AcademicContent.content_hash.in_([content_hash for _, content_hash in row_hashes]))
+        ).scalars())
+
+        for row, content_hash in row_hashes:
+            if content_hash in existing:
+                duplicates += 1
+                if delete_duplicates:
+                    db.session.delete(row)
+                continue
+            row.content_hash = content_hash
+            existing.add(content_hash)
+            hashed += 1
+
+        db.session.commit()
+        print(f"Hashed {hashed} rows, found {duplicates} duplicates")
+
+    return hashed, duplicates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--delete-duplicates', action='store_true', help='delete duplicate rows instead of leaving them unhashed')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        # Older databases lack the content_hash column, and building its unique index over rows
+        # that still hold duplicates fails; ensure_schema retries the index after the backfill
+        ensure_schema()
+        hashed, duplicates = backfill_content_hashes(args.chunk_size, args.delete_duplicates)
+        ensure_schema()
+        if duplicates and args.delete_duplicates:
+            rebuild_rollups()
+        print(f"Done: {hashed} rows hashed, {duplicates} duplicates {'deleted' if args.delete_duplicates else 'left unhashed'}")
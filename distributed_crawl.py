@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Sharded multi-node crawling coordinated through a lease table in the shared database"""
+
+import os
+import sys
+import time
+import zlib
+import socket
+import logging
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from app import create_app, db
+from models import AcademicContent, CrawlLease
+from crawler import AcademicCrawler
+from warc import open_archive
+from url_filter import canonicalize_url
+from data_processor import DataProcessor
+from db_utils import ensure_schema, insert_ignore
+from academic_sources import ACADEMIC_SOURCES, EDU_DOMAINS, ORG_DOMAINS
+
+logger = logging.getLogger(__name__)
+
+NUM_SHARDS = 64
+DEFAULT_LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+
+def shard_for_host(host):
+    """Stable shard number for a host, identical on every node"""
+    return zlib.crc32(host.lower().encode('utf-8')) % NUM_SHARDS
+
+
+def frontier_row(url, domain, depth=0):
+    host = urlsplit(url).hostname or ''
+    return {
+        'url': url,
+        'domain': domain,
+        'host': host,
+        'shard': shard_for_host(host),
+        'depth': depth,
+        'status': 'pending',
+        'attempts': 0,
+        'updated_at': datetime.utcnow()
+    }
+
+
+class LeaseCoordinator:
+    """Hands out frontier URLs to nodes through expiring leases"""
+
+    def __init__(self, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def seed(self, urls, domain=None):
+        """Add starting URLs to the frontier; already known URLs are left alone"""
+        urls = [canonicalize_url(url) for url in urls]
+        rows = [frontier_row(url, domain or urlsplit(url).hostname) for url in urls if url]
+        inserted = insert_ignore(CrawlLease, rows, ['url'])
+        db.session.commit()
+        return inserted
+
+    def claimable(self, now):
+        # Pending rows, or leases whose node stopped renewing them
+        return db.and_(
+            CrawlLease.attempts < self.max_attempts,
+            db.or_(
+                CrawlLease.status == 'pending',
+                db.and_(CrawlLease.status == 'leased', CrawlLease.lease_expires < now)
+            )
+        )
+
+    def fail_exhausted(self):
+        """Mark expired leases that were on their last attempt failed, so they are not left leased"""
+        now = datetime.utcnow()
+        result = db.session.execute(
+            db.update(CrawlLease)
+            .where(CrawlLease.status == 'leased', CrawlLease.lease_expires < now,
+                   CrawlLease.attempts >= self.max_attempts)
+            .values(status='failed', lease_expires=None, updated_at=now)
+        )
+        db.session.commit()
+        if result.rowcount:
+            logger.warning(f"{result.rowcount} leases expired on their last attempt and were marked failed")
+        return result.rowcount
+
+    def claim(self, node_id, shards, batch_size):
+        """Lease up to batch_size URLs, preferring the node's own shards"""
+        self.fail_exhausted()
+        claimed = self._claim(node_id, CrawlLease.shard.in_(shards), batch_size) if shards else []
+        if not claimed:
+            # Nothing left in our shards: help with the others, including those of dead nodes
+            claimed = self._claim(node_id, None, batch_size)
+        return claimed
+
+    def _claim(self, node_id, shard_filter, batch_size):
+        now = datetime.utcnow()
+        expires = now + timedelta(seconds=self.lease_seconds)
+
+        query = db.select(CrawlLease.id).where(self.claimable(now))
+        if shard_filter is not None:
+            query = query.where(shard_filter)
+        query = query.order_by(CrawlLease.depth, CrawlLease.id)
+
+        claim_values = {
+            'status': 'leased',
+            'owner': node_id,
+            'lease_expires': expires,
+            'attempts': CrawlLease.attempts + 1,
+            'updated_at': now
+        }
+
+        if db.engine.dialect.name == 'postgresql':
+            # Row locks let concurrent nodes skip each other's candidates
+            ids = db.session.execute(query.limit(batch_size).with_for_update(skip_locked=True)).scalars().all()
+            if ids:
+                db.session.execute(db.update(CrawlLease).where(CrawlLease.id.in_(ids)).values(**claim_values))
+        else:
+            # Optimistic claim: the conditional UPDATE only succeeds for one node per row
+            ids = []
+            candidates = db.session.execute(query.limit(batch_size * 2)).scalars().all()
+            for lease_id in candidates:
+                result = db.session.execute(
+                    db.update(CrawlLease)
+                    .where(CrawlLease.id == lease_id, self.claimable(now))
+                    .values(**claim_values)
+                )
+                if result.rowcount:
+                    ids.append(lease_id)
+                    if len(ids) >= batch_size:
+                        break
+
+        db.session.commit()
+        if not ids:
+            return []
+        return CrawlLease.query.filter(CrawlLease.id.in_(ids)).all()
+
+    def renew(self, node_id, lease_ids):
+        """Extend the leases a node still holds"""
+        if not lease_ids:
+            return
+        db.session.execute(
+            db.update(CrawlLease)
+            .where(CrawlLease.id.in_(lease_ids), CrawlLease.owner == node_id, CrawlLease.status == 'leased')
+            .values(lease_expires=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+        )
+        db.session.commit()
+
+    def complete(self, node_id, lease_ids, discovered_rows):
+        """Mark leases done and add newly discovered URLs to the frontier"""
+        if lease_ids:
+            db.session.execute(
+                db.update(CrawlLease)
+                .where(CrawlLease.id.in_(lease_ids), CrawlLease.owner == node_id)
+                .values(status='done', lease_expires=None, updated_at=datetime.utcnow())
+            )
+        insert_ignore(CrawlLease, discovered_rows, ['url'])
+        db.session.commit()
+
+    def fail(self, node_id, lease_ids):
+        """Return failed URLs to the pool until they run out of attempts"""
+        if not lease_ids:
+            return
+        now = datetime.utcnow()
+        db.session.execute(
+            db.update(CrawlLease)
+            .where(CrawlLease.id.in_(lease_ids), CrawlLease.owner == node_id)
+            .values(
+                status=db.case((CrawlLease.attempts >= self.max_attempts, 'failed'), else_='pending'),
+                lease_expires=None,
+                updated_at=now
+            )
+        )
+        db.session.commit()
+
+    def outstanding(self):
+        """URLs still pending or leased by any node"""
+        return CrawlLease.query.filter(
+            CrawlLease.attempts < self.max_attempts,
+            CrawlLease.status.in_(['pending', 'leased'])
+        ).count()
+
+    def get_stats(self):
+        counts = db.session.query(CrawlLease.status, db.func.count(CrawlLease.id)).group_by(CrawlLease.status).all()
+        owners = db.session.query(CrawlLease.owner, db.func.count(CrawlLease.id)).filter(
+            CrawlLease.status == 'done'
+        ).group_by(CrawlLease.owner).all()
+        return {'status': dict(counts), 'done_by_node': dict(owners)}
+
+
+class CrawlNode:
+    """One crawler process working through the shared frontier"""
+
+    def __init__(self, node_index=0, node_count=1, node_id=None, batch_size=10,
+                 max_depth=5, links_per_page=10, coordinator=None, crawler=None):
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.shards = [shard for shard in range(NUM_SHARDS) if shard % node_count == node_index]
+        self.batch_size = batch_size
+        self.max_depth = max_depth
+        self.links_per_page = links_per_page
+        self.coordinator = coordinator or LeaseCoordinator()
+        self.crawler = crawler or AcademicCrawler()
+        self.data_processor = DataProcessor()
+
+    def process(self, lease):
+        """Fetch and extract one leased URL; runs in a worker thread, touching the DB only for stored-body lookups"""
+        # get_page_content releases the slot when it is done
+        self.crawler.throttle.for_url(lease['url']).acquire()
+        content_data = self.crawler.get_page_content(lease['url'])
+        if not content_data:
+            return None
+
+        structured_data = None
+        if not self.crawler.is_duplicate_body(content_data):
+            structured_data = self.crawler.extract_structured_data(content_data)
+        links = []
+        if lease['depth'] < self.max_depth:
+            links = self.crawler.extract_links(content_data['soup'], lease['url'], lease['domain'], seen=set())
+        return structured_data, links[:self.links_per_page]
+
+    def run(self, max_pages=100, idle_sleep=0.5, max_idle_rounds=20):
+        """Claim, crawl and store batches until max_pages or the frontier runs dry"""
+        fetched = 0
+        saved = 0
+        idle_rounds = 0
+
+        with ThreadPoolExecutor(max_workers=self.crawler.max_host_workers) as executor:
+            while fetched < max_pages:
+                leases = self.coordinator.claim(self.node_id, self.shards, min(self.batch_size, max_pages - fetched))
+                if not leases:
+                    if self.coordinator.outstanding() == 0 or idle_rounds >= max_idle_rounds:
+                        break
+                    idle_rounds += 1
+                    time.sleep(idle_sleep)
+                    continue
+                idle_rounds = 0
+
+                # Detach plain values so worker threads never touch the session
+                work = [{'id': lease.id, 'url': lease.url, 'domain': lease.domain, 'depth': lease.depth}
+                        for lease in leases]
+                futures = [executor.submit(self.process, lease) for lease in work]
+                # Heartbeat: keep the batch's leases alive while slow pages are still being fetched
+                heartbeat = max(1, self.coordinator.lease_seconds / 3)
+                while wait(futures, timeout=heartbeat).not_done:
+                    self.coordinator.renew(self.node_id, [lease['id'] for lease in work])
+                results = [future.result() for future in futures]
+
+                items = []
+                done_ids = []
+                failed_ids = []
+                discovered = []
+                for lease, result in zip(work, results):
+                    if result is None:
+                        failed_ids.append(lease['id'])
+                        continue
+                    done_ids.append(lease['id'])
+                    structured_data, links = result
+                    if structured_data:
+                        items.append(structured_data)
+                    discovered.extend(frontier_row(link, lease['domain'], lease['depth'] + 1) for link in links)
+
+                if items:
+                    count, _ = self.data_processor.save_to_database(items, source_domain=f"node:{self.node_id}")
+                    saved += count
+                self.coordinator.complete(self.node_id, done_ids, discovered)
+                self.coordinator.fail(self.node_id, failed_ids)
+
+                fetched += len(work)
+                logger.info(f"Node {self.node_id}: {fetched}/{max_pages} pages, {saved} items saved")
+
+        return fetched, saved
+
+
+def default_seeds(crawler):
+    seeds = []
+    for domain in list(ACADEMIC_SOURCES.keys()) + EDU_DOMAINS + ORG_DOMAINS:
+        seeds.append((domain, crawler.seed_urls(domain)))
+    return seeds
+
+
+def run_demo(args):
+    """Crawl local stand-in sites with several node processes sharing one SQLite file"""
+    from local_site import start_local_site
+
+    # One site per loopback address so the frontier spans several hosts and shards
+    sites = [start_local_site(pages=args.pages, host=f"127.0.0.{i + 1}") for i in range(args.hosts)]
+    workdir = tempfile.mkdtemp(prefix='distributed-crawl-')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'crawl.db')}")
+    script = os.path.abspath(__file__)
+
+    for server, base_url in sites:
+        host = urlsplit(base_url).hostname
+        subprocess.run([sys.executable, script, 'seed', '--url', base_url, '--domain', host], env=env, check=True)
+
+    start = time.time()
+    procs = [
+        subprocess.Popen([
+            sys.executable, script, 'node',
+            '--node-index', str(i), '--node-count', str(args.nodes),
+            '--max-pages', str(args.pages * args.hosts), '--delay', str(args.delay),
+            '--lease-seconds', str(args.lease_seconds)
+        ], env=env)
+        for i in range(args.nodes)
+    ]
+
+    if args.kill_after:
+        time.sleep(args.kill_after)
+        procs[0].kill()
+        print(f"Killed node 0 after {args.kill_after}s; its leases expire in {args.lease_seconds}s")
+
+    for proc in procs:
+        proc.wait()
+    elapsed = time.time() - start
+    for server, base_url in sites:
+        server.shutdown()
+
+    subprocess.run([sys.executable, script, 'report'], env=env, check=True)
+    print(f"Elapsed: {elapsed:.1f}s, database: {env['DATABASE_URL']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='add seed URLs to the shared frontier')
+    seed_parser.add_argument('--url', action='append', help='seed URL (default: all configured sources)')
+    seed_parser.add_argument('--domain', help='crawl domain links must stay within (default: URL host)')
+
+    node_parser = subparsers.add_parser('node', help='run one crawler node')
+    node_parser.add_argument('--node-index', type=int, default=0)
+    node_parser.add_argument('--node-count', type=int, default=1)
+    node_parser.add_argument('--max-pages', type=int, default=100)
+    node_parser.add_argument('--batch-size', type=int, default=10)
+    node_parser.add_argument('--lease-seconds', type=int, default=DEFAULT_LEASE_SECONDS)
+    node_parser.add_argument('--delay', type=float, default=None, help='fixed politeness delay in seconds')
+
+    subparsers.add_parser('report', help='show frontier and corpus counts')
+
+    demo_parser = subparsers.add_parser('demo', help='run several local nodes against a stand-in site')
+    demo_parser.add_argument('--nodes', type=int, default=3)
+    demo_parser.add_argument('--hosts', type=int, default=4, help='number of loopback hosts to serve')
+    demo_parser.add_argument('--pages', type=int, default=100, help='pages per host')
+    demo_parser.add_argument('--delay', type=float, default=0.05)
+    demo_parser.add_argument('--lease-seconds', type=int, default=10)
+    demo_parser.add_argument('--kill-after', type=float, default=0, help='kill node 0 after this many seconds')
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.INFO)
+
+    if args.command == 'demo':
+        run_demo(args)
+        return
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+
+        if args.command == 'seed':
+            coordinator = LeaseCoordinator()
+            if args.url:
+                count = coordinator.seed(args.url, args.domain)
+            else:
+                count = sum(coordinator.seed(urls, domain) for domain, urls in default_seeds(AcademicCrawler()))
+            print(f"Seeded {count} URLs")
+
+        elif args.command == 'node':
+            delay_range = (args.delay, args.delay) if args.delay is not None else (1, 3)
+            node = CrawlNode(
+                node_index=args.node_index,
+                node_count=args.node_count,
+                batch_size=args.batch_size,
+                coordinator=LeaseCoordinator(lease_seconds=args.lease_seconds),
+                crawler=AcademicCrawler(delay_range=delay_range, archive=open_archive(), app=app)
+            )
+            fetched, saved = node.run(args.max_pages)
+            print(f"Node {node.node_id} fetched {fetched} pages and saved {saved} items")
+
+        elif args.command == 'report':
+            stats = LeaseCoordinator().get_stats()
+            print(f"Frontier: {stats['status']}")
+            print(f"Pages done per node: {stats['done_by_node']}")
+            print(f"AcademicContent rows: {AcademicContent.query.count()}")
+
+
+if __name__ == "__main__":
+    main()
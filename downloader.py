@@ -0,0 +1,128 @@
+"""
+Bounded, streaming download of HTML response bodies
+"""
+
+import codecs
+import logging
+import re
+import threading
+
+# Every encoding urllib3 can decode here, including br when brotli is installed
+from urllib3.util.request import ACCEPT_ENCODING
+
+logger = logging.getLogger(__name__)
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_\-:.]+)', re.IGNORECASE)
+SNIFF_BYTES = 4096
+
+
+def parse_content_type(header):
+    """Split a Content-Type header into (mime type, charset or None)"""
+    parts = [part.strip() for part in (header or '').split(';')]
+    mime_type = parts[0].lower()
+    charset = None
+    for part in parts[1:]:
+        if part.lower().startswith('charset='):
+            charset = part[8:].strip('"\' ') or None
+    return mime_type, charset
+
+
+def known_encoding(name):
+    """Return a usable codec name, or None if Python doesn't know it"""
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+class PageDownloader:
+    """Reads HTML bodies from streamed responses with a content-type check and size cap"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, allowed_types=HTML_CONTENT_TYPES, archive=None):
+        self.max_bytes = max_bytes
+        self.allowed_types = allowed_types
+        self.archive = archive
+        self.lock = threading.Lock()
+        self.stats = {
+            'pages': 0,
+            'bytes_downloaded': 0,
+            'skipped_content_type': 0,
+            'skipped_too_large': 0,
+            'bytes_saved': 0
+        }
+
+    def count(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+
+    def read(self, response):
+        """Return the decoded HTML of a streamed response, or None if it was skipped"""
+        try:
+            mime_type, charset = parse_content_type(response.headers.get('Content-Type'))
+            content_length = response.headers.get('Content-Length', '')
+            content_length = int(content_length) if content_length.isdigit() else None
+
+            if mime_type and mime_type not in self.allowed_types:
+                self.count('skipped_content_type')
+                self.count('bytes_saved', content_length or 0)
+                logger.debug(f"Skipping {response.url}: content type {mime_type}")
+                return None
+
+            if content_length is not None and content_length > self.max_bytes:
+                self.count('skipped_too_large')
+                self.count('bytes_saved', content_length)
+                logger.debug(f"Skipping {response.url}: {content_length} bytes")
+                return None
+
+            # iter_content transparently decodes gzip/deflate/br
+            chunks = []
+            size = 0
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    self.count('skipped_too_large')
+                    if content_length is not None:
+                        # Content-Length counts wire bytes, so compare against raw bytes read
+                        self.count('bytes_saved', max(0, content_length - response.raw.tell()))
+                    logger.debug(f"Aborting {response.url}: over {self.max_bytes} bytes")
+                    return None
+                chunks.append(chunk)
+
+            body = b''.join(chunks)
+            self.count('pages')
+            self.count('bytes_downloaded', size)
+            if self.archive:
+                try:
+                    self.archive.write_response(response, body)
+                except OSError as e:
+                    logger.error(f"Could not archive {response.url}: {e}")
+            return self.decode(body, charset)
+        finally:
+            response.close()
+
+    def decode(self, body, header_charset=None):
+        return body.decode(self.detect_charset(body, header_charset), errors='replace')
+
+    def detect_charset(self, body, header_charset=None):
+        """Charset from the header, then a <meta> tag in the first bytes, then UTF-8"""
+        encoding = known_encoding(header_charset)
+        if encoding:
+            return encoding
+        if body.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        match = META_CHARSET_PATTERN.search(body[:SNIFF_BYTES])
+        if match:
+            encoding = known_encoding(match.group(1).decode('ascii', 'ignore'))
+            if encoding:
+                return encoding
+        return 'utf-8'
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
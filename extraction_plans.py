@@ -0,0 +1,92 @@
+"""
+Per-domain extraction plans compiled from the ACADEMIC_SOURCES selectors
+"""
+
+import logging
+from urllib.parse import urlsplit
+
+import soupsieve
+
+from academic_sources import ACADEMIC_SOURCES
+from url_filter import host_matches
+
+logger = logging.getLogger(__name__)
+
+# Selected content shorter than this is treated as a miss
+MIN_CONTENT_LENGTH = 200
+
+
+class ExtractionPlan:
+    """Compiled selectors and field mapping for one academic source"""
+
+    def __init__(self, domain, config):
+        self.domain = domain
+        selectors = config.get('selectors', {})
+        self.title_selector = self.compile_selector(selectors.get('title'))
+        self.content_selector = self.compile_selector(selectors.get('content'))
+        self.field_mapping = dict(config.get('field_mapping', {}))
+        self.hits = 0
+        self.misses = 0
+
+    def compile_selector(self, selector):
+        if not selector:
+            return None
+        try:
+            return soupsieve.compile(selector)
+        except Exception as e:
+            logger.error(f"Invalid selector '{selector}' for {self.domain}: {e}")
+            return None
+
+    def field_for_url(self, url):
+        """Map the URL path segments to a field using field_mapping"""
+        for segment in urlsplit(url).path.lower().split('/'):
+            field = self.field_mapping.get(segment)
+            if field:
+                return field
+        return None
+
+    def extract(self, soup, url):
+        """Return title, text and field from the configured selectors, or None on a miss"""
+        if self.content_selector is None:
+            self.misses += 1
+            return None
+
+        content_elem = self.content_selector.select_one(soup)
+        text = content_elem.get_text('\n', strip=True) if content_elem else ''
+        if len(text) < MIN_CONTENT_LENGTH:
+            self.misses += 1
+            return None
+
+        title = None
+        if self.title_selector is not None:
+            title_elem = self.title_selector.select_one(soup)
+            if title_elem:
+                title = title_elem.get_text().strip() or None
+
+        self.hits += 1
+        return {
+            'text': text,
+            'title': title,
+            'field': self.field_for_url(url)
+        }
+
+
+class ExtractionPlans:
+    """All compiled plans, looked up by URL host"""
+
+    def __init__(self, sources=None):
+        sources = ACADEMIC_SOURCES if sources is None else sources
+        self.plans = {domain: ExtractionPlan(domain, config) for domain, config in sources.items()}
+
+    def get(self, domain):
+        return self.plans.get(domain)
+
+    def for_url(self, url):
+        host = urlsplit(url).hostname or ''
+        for domain, plan in self.plans.items():
+            if host_matches(host, domain):
+                return plan
+        return None
+
+    def get_stats(self):
+        return {domain: {'hits': plan.hits, 'misses': plan.misses} for domain, plan in self.plans.items()}
@@ -0,0 +1,121 @@
+"""
+Cached field/type facet counts for the data browser filters
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from app import db
+from models import AcademicContent
+
+logger = logging.getLogger(__name__)
+
+# Seconds before cached counts are recomputed even without an ingest in this
+# process; covers writes from CLI tools and other workers
+FACET_TTL = 60
+# Distinct search strings whose counts are kept
+MAX_SEARCH_ENTRIES = 64
+
+
+def search_clause(search_query):
+    return (
+        AcademicContent.title.contains(search_query) |
+        AcademicContent.summary.contains(search_query) |
+        AcademicContent.field.contains(search_query)
+    )
+
+
+class FacetCache:
+    """Per-(field, type) counts from one GROUP BY, shared by every facet lookup
+
+    The (field, type) matrix answers the total, the per-field and per-type
+    counts, and the counts within a selected field or type without another
+    query. Matrices are cached per search string and dropped on ingest.
+    """
+
+    def __init__(self, ttl=FACET_TTL, max_entries=MAX_SEARCH_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+            self.stats['invalidations'] += 1
+
+    def load_matrix(self, search_query):
+        query = db.session.query(
+            AcademicContent.field, AcademicContent.type, db.func.count(AcademicContent.id)
+        )
+        if search_query:
+            query = query.filter(search_clause(search_query))
+        return {(field, type_): count for field, type_, count in query.group_by(AcademicContent.field, AcademicContent.type)}
+
+    def matrix(self, search_query=''):
+        key = search_query or ''
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+            generation = self.generation
+            self.stats['misses'] += 1
+
+        matrix = self.load_matrix(key)
+
+        with self.lock:
+            # An ingest that finished while we were counting makes this result stale
+            if generation == self.generation:
+                self.entries[key] = (now, matrix)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return matrix
+
+    def get_facets(self, search_query='', field_filter='', type_filter=''):
+        """Counts for the filter dropdowns and the size of the filtered result
+
+        fields is counted within the selected type and types within the
+        selected field, so each dropdown shows what picking an option yields.
+        """
+        matrix = self.matrix(search_query)
+        fields = {}
+        types = {}
+        total = 0
+        matching = 0
+        for (field, type_), count in matrix.items():
+            total += count
+            fields.setdefault(field, 0)
+            types.setdefault(type_, 0)
+            if not type_filter or type_ == type_filter:
+                fields[field] += count
+            if not field_filter or field == field_filter:
+                types[type_] += count
+            if (not field_filter or field == field_filter) and (not type_filter or type_ == type_filter):
+                matching += count
+        # Keep the current selection listed even when nothing matches it
+        if field_filter:
+            fields.setdefault(field_filter, 0)
+        if type_filter:
+            types.setdefault(type_filter, 0)
+        return {
+            'total': total,
+            'matching': matching,
+            'fields': dict(sorted(fields.items())),
+            'types': dict(sorted(types.items()))
+        }
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, cached_searches=len(self.entries))
+
+
+facet_cache = FacetCache()
@@ -0,0 +1,38 @@
+"""
+Content fingerprints used to detect changed and duplicate pages
+"""
+
+import hashlib
+import re
+import unicodedata
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Case-fold, NFKC-normalize and collapse whitespace so cosmetic edits don't change the hash"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def text_hash(*parts):
+    """SHA-256 hex digest over the normalized parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(normalize_text(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def raw_hash(body):
+    """SHA-256 hex digest of a page body exactly as fetched; cheap next to extracting its text"""
+    if isinstance(body, str):
+        body = body.encode('utf-8', 'surrogatepass')
+    return hashlib.sha256(body).hexdigest()
+
+
+def record_hash(summary, facts):
+    """Fingerprint of an academic record's body: its summary and verified facts"""
+    return text_hash(summary, *(facts or []))
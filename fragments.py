@@ -0,0 +1,101 @@
+"""
+Rendered HTML of the /all-data cards, cached per row version
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from flask import render_template
+from markupsafe import Markup
+
+from models import AcademicContent
+
+logger = logging.getLogger(__name__)
+
+MAX_CARDS = int(os.environ.get('CARD_CACHE_SIZE', 5000))
+
+
+def card_key(row):
+    """Row version: id plus the columns the write paths change
+
+    Ingest and re-extraction stamp crawled_at and rewrite content_hash;
+    reclassification changes only field. Any of them makes the old fragment
+    unreachable, and it ages out of the LRU. Bulk tools that rewrite other
+    columns in place call invalidate().
+    """
+    return row.id, row.crawled_at, row.field, row.content_hash
+
+
+def render_card(item):
+    return Markup(render_template(
+        'data_card.html',
+        item=item,
+        key_people=json.loads(item.key_people) if item.key_people else [],
+        verified_facts=json.loads(item.verified_facts) if item.verified_facts else []
+    ))
+
+
+class CardCache:
+    """Bounded LRU of rendered cards keyed by (id, crawled_at, field, content_hash)"""
+
+    def __init__(self, max_entries=MAX_CARDS):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get_many(self, keys):
+        found = {}
+        with self.lock:
+            for key in keys:
+                card = self.entries.get(key)
+                if card is not None:
+                    self.entries.move_to_end(key)
+                    found[key] = card
+            self.stats['hits'] += len(found)
+            self.stats['misses'] += len(keys) - len(found)
+        return found
+
+    def put(self, key, card):
+        with self.lock:
+            self.entries[key] = card
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.stats['invalidations'] += 1
+
+    def cards_for(self, rows):
+        """Rendered cards for rows carrying the card_key columns, in order
+
+        Only rows without a cached card are loaded in full and rendered,
+        with one IN query for all of them.
+        """
+        keys = [card_key(row) for row in rows]
+        cards = self.get_many(keys)
+        missing = [key[0] for key in keys if key not in cards]
+        if missing:
+            rendered = {}
+            for item in AcademicContent.query.filter(AcademicContent.id.in_(missing)):
+                card = render_card(item)
+                # Keyed by the loaded version, in case the row changed since the page query
+                self.put(card_key(item), card)
+                rendered[item.id] = card
+            cards.update({key: rendered[key[0]] for key in keys if key not in cards and key[0] in rendered})
+        return [cards[key] for key in keys if key in cards]
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return dict(self.stats, entries=len(self.entries),
+                        hit_rate=round(self.stats['hits'] / lookups, 3) if lookups else None)
+
+
+card_cache = CardCache()
@@ -4,8 +4,10 @@
 import json
 import logging
 import random
-from app import app, db
+from app import create_app, db
 from models import AcademicContent
+from db_utils import ensure_schema
+from analytics import rebuild_rollups
 from datetime import datetime, timedelta
 
 # Base templates for generating diverse academic content
@@ -145,7 +147,9 @@ def generate_academic_entry(field_name, field_data, index):
 
 def generate_large_dataset(target_count=120000):
     """Generate large academic dataset"""
+    app = create_app()
     with app.app_context():
+        ensure_schema()
         try:
             # Clear existing data
             print("Clearing existing data...")
@@ -191,6 +195,7 @@ def generate_large_dataset(target_count=120000):
             
             # Final commit
             db.session.commit()
+            rebuild_rollups()
             print(f"Successfully created {total_created} academic records!")
             
             # Verify count
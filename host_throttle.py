@@ -0,0 +1,138 @@
+"""
+Adaptive per-host concurrency and politeness delays for the crawler
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# HTTP statuses that mean the host wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HostController:
+    """AIMD controller for one host: additive increase, multiplicative decrease"""
+
+    def __init__(self, host, initial_limit=5, min_limit=1, max_limit=20,
+                 delay_range=(1, 3), latency_target=2.0, error_threshold=0.2):
+        self.host = host
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.delay_range = delay_range
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+
+        self.delay_scale = 1.0
+        self.min_delay_scale = 0.1
+        self.max_delay_scale = 16.0
+
+        self.in_flight = 0
+        self.error_rate = 0.0
+        self.avg_latency = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.next_start = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+    def current_limit(self):
+        return max(self.min_limit, int(self.limit))
+
+    def try_acquire(self):
+        """Reserve a concurrency slot; False when the host is at its limit"""
+        with self.lock:
+            if self.in_flight >= self.current_limit():
+                return False
+            self.in_flight += 1
+            return True
+
+    def acquire(self, poll_interval=0.05):
+        """Block until a concurrency slot is free"""
+        while not self.try_acquire():
+            time.sleep(poll_interval)
+
+    def release(self):
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def wait_turn(self):
+        """Sleep until this host's politeness delay allows another request"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + random.uniform(*self.delay_range) * self.delay_scale
+        if start > now:
+            time.sleep(start - now)
+
+    def pause(self, seconds):
+        """Hold off all requests to this host, e.g. for a Retry-After header"""
+        with self.lock:
+            self.next_start = max(self.next_start, time.monotonic() + seconds)
+
+    def record(self, latency, status):
+        """Feed one request outcome: 'ok', 'error' or 'throttled'"""
+        with self.lock:
+            self.requests += 1
+            failed = status != 'ok'
+            self.error_rate = 0.9 * self.error_rate + 0.1 * (1.0 if failed else 0.0)
+            if latency is not None:
+                self.avg_latency = latency if self.requests == 1 else 0.8 * self.avg_latency + 0.2 * latency
+
+            if status == 'throttled' or self.error_rate > self.error_threshold:
+                if status == 'throttled':
+                    self.throttled += 1
+                self._decrease()
+            elif status == 'ok' and self.avg_latency <= self.latency_target:
+                # Roughly +1 slot per window of `limit` healthy responses
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self.delay_scale = max(self.min_delay_scale, self.delay_scale * 0.95)
+
+    def _decrease(self):
+        # One decrease per latency window so a burst of failures doesn't collapse the limit
+        now = time.monotonic()
+        if now - self.last_decrease < self.latency_target:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit / 2)
+        self.delay_scale = min(self.max_delay_scale, self.delay_scale * 2)
+
+    def get_stats(self):
+        return {
+            'limit': self.current_limit(),
+            'in_flight': self.in_flight,
+            'delay': round(sum(self.delay_range) / 2 * self.delay_scale, 2),
+            'avg_latency': round(self.avg_latency, 3),
+            'error_rate': round(self.error_rate, 3),
+            'requests': self.requests,
+            'throttled': self.throttled
+        }
+
+
+class HostThrottle:
+    """Registry of per-host controllers"""
+
+    def __init__(self, **controller_options):
+        self.controller_options = controller_options
+        self.controllers = {}
+        self.lock = threading.Lock()
+
+    def for_url(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        with self.lock:
+            controller = self.controllers.get(host)
+            if controller is None:
+                controller = HostController(host, **self.controller_options)
+                self.controllers[host] = controller
+            return controller
+
+    def get_stats(self):
+        with self.lock:
+            controllers = list(self.controllers.values())
+        return {controller.host: controller.get_stats() for controller in controllers}
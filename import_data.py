@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Stream a JSON array or NDJSON dump (optionally gzipped) into AcademicContent
+
+Records are parsed incrementally, validated and deduplicated in batches, and
+inserted by parallel workers. Progress is checkpointed next to the input, so
+rerunning the same command after an interruption resumes where it stopped.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import time
+import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app import create_app, db
+from data_processor import DataProcessor, SAVE_BATCH_SIZE
+from db_utils import ensure_schema
+from storage import backend_name
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_CHARS = 1024 * 1024
+# A record that still fails to parse past this size is malformed, not incomplete
+MAX_RECORD_CHARS = 64 * 1024 * 1024
+REQUIRED_FIELDS = ('type', 'title', 'field')
+LIST_FIELDS = ('key_people', 'verified_facts')
+OPTIONAL_STRING_FIELDS = ('date', 'location', 'summary', 'source_url', 'content_hash', 'body_hash')
+PROGRESS_INTERVAL = 5
+
+
+def open_dump(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_json_records(stream):
+    """Yield objects from a JSON array or from NDJSON without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    def fill():
+        # Keep only the unconsumed tail, so the buffer stays around one chunk
+        nonlocal buffer, position, eof
+        chunk = stream.read(READ_CHUNK_CHARS)
+        buffer = buffer[position:] + chunk
+        position = 0
+        eof = not chunk
+
+    fill()
+    buffer = buffer.lstrip('\ufeff \t\r\n')
+    in_array = buffer.startswith('[')
+    if in_array:
+        position = 1
+    separators = ' \t\r\n,' if in_array else ' \t\r\n'
+
+    while True:
+        while position < len(buffer) and buffer[position] in separators:
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                return
+            fill()
+            continue
+        if in_array and buffer[position] == ']':
+            return
+
+        try:
+            record, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof or len(buffer) - position > MAX_RECORD_CHARS:
+                raise
+            fill()
+            continue
+        yield record
+
+
+def validate(record):
+    """Return an error message, or None when the record can be stored"""
+    if not isinstance(record, dict):
+        return 'not an object'
+    for key in REQUIRED_FIELDS:
+        if not isinstance(record.get(key), str) or not record[key].strip():
+            return f"missing {key}"
+    for key in OPTIONAL_STRING_FIELDS:
+        if record.get(key) is not None and not isinstance(record[key], str):
+            return f"{key} must be a string"
+    for key in LIST_FIELDS:
+        value = record.get(key)
+        if value is not None and not (isinstance(value, list) and all(isinstance(item, str) for item in value)):
+            return f"{key} must be a list of strings"
+    return None
+
+
+class Checkpoint:
+    """Records consumed from one input file, stored as JSON beside it"""
+
+    def __init__(self, path, input_path):
+        self.path = path
+        stat = os.stat(input_path)
+        self.identity = {'input': os.path.abspath(input_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        self.state = {'records': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            saved = json.load(f)
+        if saved.get('identity') != self.identity:
+            logger.warning(f"Checkpoint {self.path} belongs to a different file version, starting over")
+            return False
+        self.state = saved['state']
+        return True
+
+    def save(self):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump({'identity': self.identity, 'state': self.state}, f)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def prepare_batch(records):
+    """Validate and hash (index, record) pairs; runs in a worker process when enabled"""
+    processor = DataProcessor()
+    rows = []
+    errors = []
+    for index, record in records:
+        error = validate(record)
+        if error:
+            errors.append((index, error))
+        else:
+            rows.append(processor.item_to_row(record))
+    return len(records), rows, errors
+
+
+class BulkImporter:
+    """Parse on the calling thread, hash in worker processes, insert on worker threads
+
+    Content hashing is CPU-bound, so it runs in a process pool; inserts wait
+    on the database, so they run on threads with their own sessions.
+    Batches can finish out of order, so the checkpoint only advances past a
+    batch once every earlier batch is committed. Records replayed after a
+    crash are dropped again by the content-hash and (title, field) checks.
+    """
+
+    def __init__(self, app, checkpoint, workers=1, processes=0, batch_size=SAVE_BATCH_SIZE):
+        self.app = app
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.processes = processes
+        self.batch_size = batch_size
+        self.processor = DataProcessor()
+        self.local = threading.local()
+        # Short hash prefixes keep the in-file seen sets small on multi-million row dumps
+        self.seen_hashes = set()
+        self.seen_titles = set()
+        self.completed = {}
+        self.next_batch = 0
+        self.invalid_logged = 0
+        self.lock = threading.Lock()
+
+    def insert(self, rows):
+        """Worker: one app context per thread, so each gets its own session"""
+        if getattr(self.local, 'context', None) is None:
+            self.local.context = self.app.app_context()
+            self.local.context.push()
+        try:
+            return self.processor.insert_batch(rows, set(), set())
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def dedupe(self, rows):
+        unique = []
+        for row in rows:
+            content_key = row['content_hash'][:16]
+            title_key = hashlib.sha256(f"{row['title']}\x1f{row['field']}".encode('utf-8')).hexdigest()[:16]
+            if content_key in self.seen_hashes or title_key in self.seen_titles:
+                continue
+            self.seen_hashes.add(content_key)
+            self.seen_titles.add(title_key)
+            unique.append(row)
+        return unique
+
+    def finish(self, batch_number, consumed, invalid, inserted):
+        """Advance the checkpoint over the contiguous run of finished batches"""
+        with self.lock:
+            self.completed[batch_number] = (consumed, invalid, inserted)
+            while self.next_batch in self.completed:
+                consumed, invalid, inserted = self.completed.pop(self.next_batch)
+                state = self.checkpoint.state
+                state['records'] += consumed
+                state['invalid'] += invalid
+                state['inserted'] += inserted
+                state['duplicates'] += consumed - invalid - inserted
+                self.next_batch += 1
+            self.checkpoint.save()
+
+    def run(self, stream):
+        skip = self.checkpoint.state['records']
+        started = time.monotonic()
+        last_report = started
+        batch_number = 0
+        raw = []
+        prepared = deque()
+        inserts = {}
+
+        def insert_prepared(limit):
+            # Prepared batches are taken in file order so dedupe and checkpoints stay deterministic
+            nonlocal batch_number
+            while len(prepared) > limit:
+                batch = prepared.popleft()
+                consumed, rows, errors = batch.result() if isinstance(batch, Future) else batch
+                for index, error in errors:
+                    self.invalid_logged += 1
+                    if self.invalid_logged <= 10:
+                        logger.warning(f"Skipping record {index}: {error}")
+                future = insert_pool.submit(self.insert, self.dedupe(rows))
+                inserts[future] = (batch_number, consumed, len(errors))
+                batch_number += 1
+                # Bound the batches held in memory
+                while len(inserts) >= self.workers * 2:
+                    done, _ = wait(inserts, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+        def collect(done):
+            for future in done:
+                number, consumed, invalid = inserts.pop(future)
+                self.finish(number, consumed, invalid, future.result())
+
+        prepare_pool = ProcessPoolExecutor(self.processes) if self.processes else None
+        with ThreadPoolExecutor(max_workers=self.workers) as insert_pool:
+            try:
+                for index, record in enumerate(iter_json_records(stream)):
+                    if index < skip:
+                        continue
+                    raw.append((index, record))
+                    if len(raw) >= self.batch_size:
+                        prepared.append(prepare_pool.submit(prepare_batch, raw) if prepare_pool else prepare_batch(raw))
+                        raw = []
+                        insert_prepared(self.processes)
+
+                    now = time.monotonic()
+                    if now - last_report >= PROGRESS_INTERVAL:
+                        last_report = now
+                        self.report(now - started, skip)
+
+                if raw:
+                    prepared.append(prepare_batch(raw))
+                insert_prepared(0)
+                done, _ = wait(inserts)
+                collect(done)
+            finally:
+                if prepare_pool:
+                    prepare_pool.shutdown(cancel_futures=True)
+
+        return self.report(time.monotonic() - started, skip)
+
+    def report(self, elapsed, skipped=0):
+        state = self.checkpoint.state
+        rate = (state['records'] - skipped) / elapsed if elapsed else 0.0
+        print(f"{state['records']} records, {state['inserted']} inserted, {state['duplicates']} duplicates, "
+              f"{state['invalid']} invalid, {rate:.0f} rows/sec")
+        return dict(state, rows_per_sec=rate)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('path', help='JSON array or NDJSON file, optionally .gz')
+    parser.add_argument('--workers', type=int, default=None, help='insert threads (default 1 on SQLite, 4 otherwise)')
+    parser.add_argument('--processes', type=int, default=max(0, min(4, (os.cpu_count() or 1) - 1)),
+                        help='hashing processes, 0 to hash on the parsing thread')
+    parser.add_argument('--batch-size', type=int, default=SAVE_BATCH_SIZE)
+    parser.add_argument('--checkpoint', default=None, help='checkpoint file (default <path>.checkpoint)')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        database_url = app.config['SQLALCHEMY_DATABASE_URI']
+
+    # SQLite allows one writer at a time, so extra workers would only queue on its lock
+    workers = args.workers or (1 if backend_name(database_url) == 'sqlite' else 4)
+
+    checkpoint = Checkpoint(args.checkpoint or f"{args.path}.checkpoint", args.path)
+    if not args.restart and checkpoint.load():
+        print(f"Resuming after {checkpoint.state['records']} records")
+
+    importer = BulkImporter(app, checkpoint, workers=workers, processes=args.processes, batch_size=args.batch_size)
+    with open_dump(args.path) as stream:
+        importer.run(stream)
+    checkpoint.clear()
@@ -0,0 +1,167 @@
+"""
+Best-first link ordering: field relevance of anchor text and URL, depth, and per-field quotas
+"""
+
+import os
+import re
+import heapq
+import logging
+import threading
+import itertools
+from collections import Counter
+
+from academic_sources import FIELD_KEYWORDS
+
+logger = logging.getLogger(__name__)
+
+ANCHOR_WEIGHT = 2.0      # A field keyword in the link text
+URL_WEIGHT = 1.0         # A field keyword in the URL path
+MAPPING_WEIGHT = 3.0     # A path segment the source's field_mapping assigns to a field
+FILLED_FIELD_WEIGHT = 0.2  # Relevance multiplier left for a field whose quota is already met
+DEPTH_PENALTY = 0.5
+BOILERPLATE_PENALTY = 2.0
+# Links kept per queue (one queue per crawl domain); the worst are dropped beyond this
+MAX_QUEUED_LINKS = int(os.environ.get('MAX_QUEUED_LINKS', 5000))
+BOILERPLATE_WORDS = {
+    'about', 'account', 'accessibility', 'calendar', 'careers', 'cookie', 'cookies', 'directory',
+    'donate', 'events', 'faq', 'feedback', 'give', 'help', 'jobs', 'newsletter', 'search',
+    'shop', 'signin', 'sitemap', 'staff', 'store', 'subscribe'
+}
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def link_text(url):
+    """URL path and query as space-separated lowercase words, so 'earth-science' matches 'earth science'"""
+    path = url.split('://', 1)[-1].partition('/')[2]
+    return ' ' + ' '.join(WORD_PATTERN.findall(path.lower())) + ' '
+
+
+class FieldQuota:
+    """Items extracted per field against an even share of the target count"""
+
+    def __init__(self, target_count=None, fields=FIELD_KEYWORDS):
+        self.fields = list(fields)
+        self.quota = None
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.set_target(target_count)
+
+    def set_target(self, target_count):
+        self.quota = target_count / len(self.fields) if target_count else None
+
+    def add(self, field, count=1):
+        with self.lock:
+            self.counts[field] += count
+
+    def deficit(self, field):
+        """1.0 for an empty field down to 0.0 once its quota is met"""
+        if not self.quota:
+            return 1.0
+        with self.lock:
+            filled = self.counts[field]
+        return max(0.0, 1.0 - filled / self.quota)
+
+    def get_stats(self):
+        with self.lock:
+            return {'quota': round(self.quota) if self.quota else None, 'counts': dict(self.counts)}
+
+
+class LinkScorer:
+    """Scores a discovered link by how likely it leads to an item in an under-filled field"""
+
+    def __init__(self, quota=None, extraction_plans=None, field_keywords=FIELD_KEYWORDS):
+        self.quota = quota or FieldQuota()
+        self.extraction_plans = extraction_plans
+        # Padded so keywords only match whole words
+        self.field_keywords = {field: [f' {keyword.lower()} ' for keyword in keywords]
+                               for field, keywords in field_keywords.items()}
+
+    def relevance(self, url, anchor=''):
+        """(best field or None, its relevance, boilerplate penalty)"""
+        url_words = link_text(url)
+        anchor_words = ' ' + ' '.join(WORD_PATTERN.findall(anchor.lower())) + ' ' if anchor else ' '
+
+        scores = Counter()
+        for field, keywords in self.field_keywords.items():
+            for keyword in keywords:
+                if keyword in anchor_words:
+                    scores[field] += ANCHOR_WEIGHT
+                if keyword in url_words:
+                    scores[field] += URL_WEIGHT
+
+        plan = self.extraction_plans.for_url(url) if self.extraction_plans else None
+        mapped = plan.field_for_url(url) if plan else None
+        if mapped:
+            scores[mapped] += MAPPING_WEIGHT
+
+        words = set(url_words.split()) | set(anchor_words.split())
+        penalty = BOILERPLATE_PENALTY if words & BOILERPLATE_WORDS else 0.0
+
+        if not scores:
+            return None, 0.0, penalty
+        # Ties go to the field with more room left in its quota
+        field = max(scores, key=lambda name: (scores[name], self.quota.deficit(name)))
+        return field, scores[field], penalty
+
+    def priority(self, field, relevance, depth, penalty):
+        weight = FILLED_FIELD_WEIGHT + self.quota.deficit(field) if field else 0.0
+        return relevance * weight - depth * DEPTH_PENALTY - penalty
+
+
+class BestFirstQueue:
+    """Max-priority queue of links, re-scored lazily as field quotas fill
+
+    A link's priority can only fall after it is queued (its field's deficit
+    shrinks as items arrive), so the top entry is re-scored before being
+    handed out and pushed back if it no longer beats the runner-up.
+
+    The queue holds at most max_size links: once it grows a quarter past
+    that, it is cut back to the best max_size by their stored priorities,
+    which keeps trimming amortized O(log n) per add.
+    """
+
+    def __init__(self, scorer, max_size=MAX_QUEUED_LINKS):
+        self.scorer = scorer
+        self.max_size = max_size
+        self.heap = []
+        self.counter = itertools.count()
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add(self, url, anchor='', depth=0):
+        """Queue a link; returns the URLs dropped to stay within max_size"""
+        field, relevance, penalty = self.scorer.relevance(url, anchor)
+        priority = self.scorer.priority(field, relevance, depth, penalty)
+        # The counter keeps equal priorities in discovery order
+        heapq.heappush(self.heap, (-priority, next(self.counter), url, depth, field, relevance, penalty))
+        if self.max_size and len(self.heap) > self.max_size + self.max_size // 4:
+            return self.trim()
+        return []
+
+    def trim(self):
+        """Keep the max_size best links and return the URLs of the rest"""
+        # A sorted list is a valid heap
+        self.heap.sort()
+        dropped = [entry[2] for entry in self.heap[self.max_size:]]
+        del self.heap[self.max_size:]
+        self.dropped += len(dropped)
+        return dropped
+
+    def peek(self):
+        """(url, depth) of the best link, or None when empty"""
+        while self.heap:
+            stored, order, url, depth, field, relevance, penalty = self.heap[0]
+            current = self.scorer.priority(field, relevance, depth, penalty)
+            if current >= -stored - 1e-9 or len(self.heap) == 1 or current >= -min(self.heap[1:3])[0]:
+                return url, depth
+            heapq.heapreplace(self.heap, (-current, order, url, depth, field, relevance, penalty))
+        return None
+
+    def pop(self):
+        """Remove and return (url, depth) of the best link"""
+        if self.peek() is None:
+            raise IndexError('pop from an empty queue')
+        _, _, url, depth, _, _, _ = heapq.heappop(self.heap)
+        return url, depth
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Local stand-in academic site for exercising the crawler without the internet"""
+
+import argparse
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+TOPICS = [
+    ('physics', 'quantum mechanics and relativity'),
+    ('chemistry', 'chemical reaction of a molecule'),
+    ('biology', 'cell genetics and evolution'),
+    ('astronomy', 'planet star and galaxy observations'),
+    ('history', 'ancient civilization and empire'),
+    ('computer-science', 'algorithm and programming software')
+]
+PEOPLE = ['Albert Einstein', 'Marie Curie', 'Isaac Newton', 'Charles Darwin', 'Alan Turing', 'Ada Lovelace']
+
+
+def render_page(number, total_pages):
+    """Deterministic HTML for page `number` with links to its children"""
+    rng = random.Random(number)
+    slug, topic = TOPICS[number % len(TOPICS)]
+    person = rng.choice(PEOPLE)
+    year = rng.randint(1900, 2020)
+
+    sentences = [
+        f"{person} discovered an important principle of {topic} in {year}",
+        f"This study of {topic} describes the experiment and its results in detail for page {number}",
+        f"The theory explains how {topic} relates to other areas of {slug} research",
+        f"Later work confirmed the law with careful measurements and independent observation"
+    ]
+    body = '. '.join(sentences * 3) + '.'
+
+    links = []
+    for child in range(number * 3 + 1, number * 3 + 4):
+        if child < total_pages:
+            links.append(f'<a href="/{TOPICS[child % len(TOPICS)][0]}/{child}">{TOPICS[child % len(TOPICS)][1]}</a>')
+    # Links the URL filter should reject or collapse
+    links.append(f'<a href="/{slug}/{number}#section">same page</a>')
+    links.append(f'<a href="/{slug}/{number}?utm_source=local">tracked</a>')
+    links.append(f'<a href="/files/{number}.pdf">pdf</a>')
+    links.append('<a href="mailto:office@example.edu">mail</a>')
+
+    return (
+        f"<html><head><title>Page {number}</title></head><body>"
+        f"<h1>{topic.title()} {number}</h1><article><p>{body}</p></article>"
+        f"<nav>{''.join(links)}</nav></body></html>"
+    )
+
+
+class LocalSiteHandler(BaseHTTPRequestHandler):
+    total_pages = 1000
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?')[0].split('#')[0]
+        last = path.rstrip('/').rsplit('/', 1)[-1]
+        if path in ('', '/'):
+            number = 0
+        elif last.isdigit() and int(last) < self.total_pages:
+            number = int(last)
+        else:
+            self.send_error(404)
+            return
+
+        body = render_page(number, self.total_pages).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_local_site(port=0, pages=1000, host='127.0.0.1'):
+    """Start the site in a daemon thread; returns (server, base_url)
+
+    Other loopback addresses (127.0.0.2, ...) can stand in for separate hosts on Linux.
+    """
+    handler = type('Handler', (LocalSiteHandler,), {'total_pages': pages})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--pages', type=int, default=1000)
+    args = parser.parse_args()
+
+    server, base_url = start_local_site(args.port, args.pages)
+    print(f"Serving {args.pages} pages at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
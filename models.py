@@ -3,6 +3,15 @@ from datetime import datetime
 import json
 
 class AcademicContent(db.Model):
+    __table_args__ = (
+        # Covers the facet GROUP BY field, type and the field/type filters
+        db.Index('ix_academic_content_field_type', 'field', 'type'),
+        # Lookup for the (title, field) duplicate check on ingest
+        db.Index('ix_academic_content_title_field', 'title', 'field'),
+        # Range scans over crawl generations for cold_storage.py archive
+        db.Index('ix_academic_content_crawled_at', 'crawled_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(100), nullable=False)
     title = db.Column(db.String(500), nullable=False)
@@ -12,8 +21,17 @@ class AcademicContent(db.Model):
     key_people = db.Column(db.Text)  # JSON string
     summary = db.Column(db.Text)
     verified_facts = db.Column(db.Text)  # JSON string
-    source_url = db.Column(db.String(500))
+    source_url = db.Column(db.String(500), index=True)
     crawled_at = db.Column(db.DateTime, default=datetime.utcnow)
+    content_hash = db.Column(db.String(64), unique=True, index=True)  # Normalized summary + facts
+    body_hash = db.Column(db.String(64), index=True)  # Normalized page text the row was extracted from
+    
+    # Keys of to_dict(), the default representation in the data APIs
+    API_FIELDS = ('type', 'title', 'field', 'date', 'location', 'key_people', 'summary', 'verified_facts')
+    # Further columns a client may ask for with ?fields=
+    EXTRA_API_FIELDS = ('id', 'source_url')
+    # Stored as JSON text, returned as lists
+    JSON_FIELDS = ('key_people', 'verified_facts')
     
     def to_dict(self):
         return {
@@ -34,3 +52,73 @@ class CrawlStatus(db.Model):
     total_items = db.Column(db.Integer, default=0)
     status = db.Column(db.String(50), default='pending')
     error_message = db.Column(db.Text)
+
+class CrawlLease(db.Model):
+    """Shared crawl frontier: one row per URL, claimed by nodes through time-limited leases"""
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), nullable=False, unique=True)
+    domain = db.Column(db.String(200), nullable=False)  # Crawl domain the URL was discovered under
+    host = db.Column(db.String(200), nullable=False)
+    shard = db.Column(db.Integer, nullable=False, index=True)
+    depth = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, leased, done, failed
+    owner = db.Column(db.String(100))
+    lease_expires = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class PageState(db.Model):
+    """Per-URL change history used by the incremental recrawl planner"""
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), nullable=False, unique=True)
+    content_hash = db.Column(db.String(64))  # text_hash of the extracted text, as AcademicContent.body_hash
+    raw_hash = db.Column(db.String(64))  # raw_hash of the fetched HTML
+    etag = db.Column(db.String(200))
+    last_modified = db.Column(db.String(100))
+    first_fetched = db.Column(db.DateTime)
+    last_fetched = db.Column(db.DateTime)
+    last_changed = db.Column(db.DateTime)
+    fetch_count = db.Column(db.Integer, default=0)
+    change_count = db.Column(db.Integer, default=0)
+    change_rate = db.Column(db.Float, default=0.0)  # Estimated changes per day
+    next_due = db.Column(db.DateTime, index=True)
+
+class AnalyticsRollup(db.Model):
+    """Item counts per (dimension, field, value), kept current on ingest by analytics.py
+
+    field '' holds the total over all fields, so corpus-wide questions are
+    answered from the same index as per-field ones.
+    """
+    __table_args__ = (
+        db.Index('ix_analytics_rollup_top', 'dimension', 'field', 'item_count'),
+    )
+    
+    dimension = db.Column(db.String(20), primary_key=True)  # decade, location, person
+    field = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.String(500), primary_key=True)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ColdSegment(db.Model):
+    """Up to SEGMENT_ROWS archived AcademicContent rows of one crawl generation, as gzipped NDJSON
+
+    Written and read by cold_storage.py. The per-field and per-type counts let
+    statistics include archived rows without decompressing the payload.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.String(7), nullable=False, index=True)  # YYYY-MM of crawled_at
+    row_count = db.Column(db.Integer, nullable=False)
+    min_id = db.Column(db.Integer)
+    max_id = db.Column(db.Integer)
+    field_counts = db.Column(db.Text)  # JSON object
+    type_counts = db.Column(db.Text)  # JSON object
+    raw_bytes = db.Column(db.Integer)  # NDJSON size before compression
+    stored_bytes = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    payload = db.Column(db.LargeBinary, nullable=False)
+
+class ArchivedKey(db.Model):
+    """Source URL and content hash of each archived row, so ingest finds the archived copies a new row replaces"""
+    id = db.Column(db.Integer, primary_key=True)
+    segment_id = db.Column(db.Integer, nullable=False, index=True)
+    source_url = db.Column(db.String(500), index=True)
+    content_hash = db.Column(db.String(64), index=True)
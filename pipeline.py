@@ -0,0 +1,409 @@
+"""
+Staged crawl pipeline: threaded fetch, process-pool parse/extract, batched DB writes
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from academic_sources import ACADEMIC_SOURCES, EDU_DOMAINS, ORG_DOMAINS
+from fingerprint import text_hash
+from link_priority import LinkScorer, BestFirstQueue
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 2.0         # Seconds a partial batch may wait before it is written
+IDLE_POLL = 0.05
+
+_worker_crawler = None
+
+
+def parse_page(url, domain, html):
+    """Parse stage, run in a worker process: record, outgoing (link, anchor) pairs and body hash for one page"""
+    global _worker_crawler
+    if _worker_crawler is None:
+        from crawler import AcademicCrawler
+        _worker_crawler = AcademicCrawler()
+
+    content_data = _worker_crawler.parse_html(url, html)
+    if not content_data:
+        return None, [], None
+    body_hash = text_hash(content_data['text']) if content_data['text'] else None
+    content_data['body_hash'] = body_hash
+    record = _worker_crawler.extract_structured_data(content_data)
+    links = _worker_crawler.extract_links(content_data['soup'], url, domain, seen=set(), with_anchors=True)
+    return record, links, body_hash
+
+
+class StageStats:
+    """Throughput and queue depth of one pipeline stage"""
+
+    def __init__(self, name, workers, queue_size=None):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+
+    def record(self, seconds, error=False):
+        with self.lock:
+            self.processed += 1
+            self.busy_seconds += seconds
+            if error:
+                self.errors += 1
+
+    def observe_depth(self, depth):
+        with self.lock:
+            self.max_depth = max(self.max_depth, depth)
+
+    def get_stats(self, depth):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': depth,
+                'max_queue_depth': self.max_depth,
+                'queue_size': self.queue_size,
+                'processed': self.processed,
+                'errors': self.errors,
+                'avg_ms': round(self.busy_seconds / self.processed * 1000, 1) if self.processed else 0.0
+            }
+
+
+class Frontier:
+    """Per-domain best-first link queues with page budgets, handed out as host slots allow"""
+
+    def __init__(self, throttle, scorer):
+        self.throttle = throttle
+        self.scorer = scorer
+        self.lock = threading.Lock()
+        self.queues = {}
+        self.budgets = {}
+        self.claimed = {}
+        self.queued = set()
+        self.in_flight = 0
+        self.closed = False
+
+    def add_domain(self, domain, urls, budget):
+        with self.lock:
+            self.queues.setdefault(domain, BestFirstQueue(self.scorer))
+            self.budgets[domain] = budget
+            self.claimed.setdefault(domain, 0)
+            for url in urls:
+                if url not in self.queued:
+                    self.queued.add(url)
+                    self.queues[domain].add(url)
+
+    def add_links(self, domain, links, depth):
+        """Queue (link, anchor) pairs found at depth - 1; the page budget is spent on the best of them"""
+        with self.lock:
+            for link, anchor in links:
+                if link not in self.queued:
+                    self.queued.add(link)
+                    # The per-domain queue is capped; its dropped links may be found and queued again
+                    self.queued.difference_update(self.queues[domain].add(link, anchor, depth))
+
+    def claim(self):
+        """Best (url, domain, depth) among hosts with a free slot, or None"""
+        with self.lock:
+            if self.closed:
+                return None
+            for domain, urls in self.queues.items():
+                if not urls or self.claimed[domain] >= self.budgets[domain]:
+                    continue
+                url, _ = urls.peek()
+                if not self.throttle.for_url(url).try_acquire():
+                    continue
+                self.claimed[domain] += 1
+                self.in_flight += 1
+                url, depth = urls.pop()
+                return url, domain, depth
+            return None
+
+    def finish(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+
+    def exhausted(self):
+        """Nothing queued within budget and nothing in flight"""
+        with self.lock:
+            if self.closed:
+                return True
+            if self.in_flight:
+                return False
+            return not any(urls and self.claimed[domain] < self.budgets[domain]
+                           for domain, urls in self.queues.items())
+
+    def pending(self):
+        with self.lock:
+            return sum(len(urls) for urls in self.queues.values())
+
+
+class CrawlPipeline:
+    """fetch (threads) -> parse queue -> parse/extract (processes) -> store queue -> writer
+
+    Bounded queues between the stages give backpressure: when parsing falls
+    behind, fetch threads block on a full parse queue instead of buffering
+    HTML; when the database falls behind, parse results wait. The writer
+    commits every batch_size records or FLUSH_INTERVAL seconds, so items
+    reach the database seconds after their page was fetched.
+    """
+
+    def __init__(self, crawler, app, fetch_workers=20, parse_workers=None, batch_size=200,
+                 parse_queue_size=None, store_queue_size=None, use_processes=True):
+        self.crawler = crawler
+        self.app = app
+        if crawler.stored_bodies is None:
+            from crawler import StoredBodies
+            crawler.stored_bodies = StoredBodies(app)
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.use_processes = use_processes
+        self.parse_queue = queue.Queue(parse_queue_size or self.parse_workers * 4)
+        self.store_queue = queue.Queue(store_queue_size or batch_size * 4)
+        self.frontier = Frontier(crawler.throttle, LinkScorer(crawler.field_quota, crawler.extraction_plans))
+        self.stats = {
+            'fetch': StageStats('fetch', fetch_workers),
+            'parse': StageStats('parse', self.parse_workers, self.parse_queue.maxsize),
+            'store': StageStats('store', 1, self.store_queue.maxsize)
+        }
+        self.saved = 0
+        self.extracted = 0
+        self.failed = 0  # Extracted records that could not be stored
+        self.fetch_to_store = deque(maxlen=1000)
+        self.stop = threading.Event()
+        self.fetchers_done = threading.Event()
+        self.parse_done = threading.Event()
+        self.target_count = None
+
+    def seed_all_sources(self, target_count):
+        """Same domains and page budgets as crawl_all_sources, all queued at once"""
+        total_domains = len(ACADEMIC_SOURCES) + len(EDU_DOMAINS) + len(ORG_DOMAINS)
+        pages_per_domain = max(50, target_count // (total_domains * 3))
+        for domain in ACADEMIC_SOURCES:
+            self.frontier.add_domain(domain, self.crawler.seed_urls(domain), pages_per_domain)
+        for domain in EDU_DOMAINS + ORG_DOMAINS:
+            self.frontier.add_domain(domain, self.crawler.seed_urls(domain), pages_per_domain // 2)
+
+    def fetch_worker(self):
+        while not self.stop.is_set():
+            task = self.frontier.claim()
+            if task is None:
+                if self.frontier.exhausted():
+                    return
+                time.sleep(IDLE_POLL)
+                continue
+
+            url, domain, depth = task
+            controller = self.crawler.throttle.for_url(url)
+            start = time.monotonic()
+            html = None
+            try:
+                html = self.crawler.downloader.read(self.crawler.fetch(url))
+            except Exception as e:
+                logger.error(f"Error fetching {url}: {e}")
+            finally:
+                controller.release()
+            self.stats['fetch'].record(time.monotonic() - start, error=html is None)
+
+            if html is None:
+                self.frontier.finish()
+                continue
+            self.crawler.crawled_urls.add(url)
+            # Blocks while the parse stage is saturated
+            self.parse_queue.put((url, domain, depth, html, time.monotonic()))
+            self.stats['parse'].observe_depth(self.parse_queue.qsize())
+
+    def parse_dispatcher(self, executor):
+        """Feed the pool from the parse queue, keeping at most two tasks per worker in flight
+
+        The pool's done callback only hands the finished future to a collector
+        thread. Queuing links, the stored-body lookup and the store-queue put,
+        which blocks while the writer is behind, all happen on the collector,
+        so a slow store stage never holds up the pool's result handling. A
+        task's slot is freed once the collector is done with it.
+        """
+        slots = threading.Semaphore(self.parse_workers * 2)
+        finished = queue.Queue()
+
+        def collect():
+            while True:
+                task = finished.get()
+                if task is None:
+                    return
+                future, url, domain, depth, fetched_at, submitted, completed = task
+                try:
+                    try:
+                        record, links, body_hash = future.result()
+                        error = False
+                    except Exception as e:
+                        logger.error(f"Error parsing {url}: {e}")
+                        record, links, body_hash, error = None, [], None, True
+                    self.stats['parse'].record(completed - submitted, error)
+
+                    self.frontier.add_links(domain, links, depth + 1)
+                    if record and not self.crawler.is_known_body(body_hash):
+                        self.extracted += 1
+                        self.crawler.field_quota.add(record.field)
+                        self.store_queue.put((record, fetched_at))
+                        self.stats['store'].observe_depth(self.store_queue.qsize())
+                except Exception as e:
+                    logger.error(f"Error collecting {url}: {e}")
+                finally:
+                    self.frontier.finish()
+                    slots.release()
+
+        collector = threading.Thread(target=collect, daemon=True)
+        collector.start()
+
+        while True:
+            try:
+                url, domain, depth, html, fetched_at = self.parse_queue.get(timeout=IDLE_POLL)
+            except queue.Empty:
+                if self.fetchers_done.is_set():
+                    break
+                continue
+            if self.stop.is_set():
+                # The writer is gone: drop fetched pages instead of parsing them
+                self.frontier.finish()
+                continue
+            slots.acquire()
+            submitted = time.monotonic()
+            future = executor.submit(parse_page, url, domain, html)
+            future.add_done_callback(
+                lambda f, u=url, d=domain, n=depth, t=fetched_at, s=submitted:
+                    finished.put((f, u, d, n, t, s, time.monotonic())))
+
+        # Wait for the tasks still in the pool and their collection
+        for _ in range(self.parse_workers * 2):
+            slots.acquire()
+        finished.put(None)
+        collector.join()
+        self.parse_done.set()
+
+    def writer(self):
+        """Store records in batches; if storing breaks down, stop the crawl and drain the store queue"""
+        try:
+            self.write_batches()
+        except Exception as e:
+            logger.error(f"Writer stopped: {e}")
+            self.stop.set()
+            self.frontier.close()
+            # The collector blocks on a full store queue until parsing is done
+            while not (self.parse_done.is_set() and self.store_queue.empty()):
+                try:
+                    self.store_queue.get(timeout=IDLE_POLL)
+                    self.failed += 1
+                except queue.Empty:
+                    pass
+
+    def write_batches(self):
+        from data_processor import DataProcessor
+        processor = DataProcessor()
+        seen_hashes = set()
+        seen_titles = set()
+        batch = []
+        fetched_times = []
+        last_flush = time.monotonic()
+
+        with self.app.app_context():
+            while True:
+                try:
+                    record, fetched_at = self.store_queue.get(timeout=IDLE_POLL)
+                except queue.Empty:
+                    if self.parse_done.is_set() and self.store_queue.empty() and not batch:
+                        return
+                else:
+                    try:
+                        batch.append(processor.item_to_row(record))
+                        fetched_times.append(fetched_at)
+                    except Exception as e:
+                        logger.error(f"Error preparing record '{getattr(record, 'title', None)}': {e}")
+                        self.failed += 1
+
+                now = time.monotonic()
+                if batch and (len(batch) >= self.batch_size or now - last_flush >= FLUSH_INTERVAL
+                              or self.parse_done.is_set()):
+                    start = time.monotonic()
+                    try:
+                        self.saved += processor.insert_batch(batch, seen_hashes, seen_titles)
+                        error = False
+                    except Exception as e:
+                        logger.error(f"Error saving batch of {len(batch)}: {e}")
+                        self.failed += len(batch)
+                        from app import db
+                        db.session.rollback()
+                        error = True
+                    stored_at = time.monotonic()
+                    self.stats['store'].record(stored_at - start, error)
+                    self.fetch_to_store.extend(stored_at - fetched for fetched in fetched_times)
+                    batch, fetched_times = [], []
+                    last_flush = stored_at
+                    if self.target_count and self.saved >= self.target_count:
+                        self.frontier.close()
+
+    def run(self, target_count, progress=None, progress_interval=2.0):
+        """Crawl until target_count items are stored or the frontier runs dry"""
+        self.target_count = target_count
+        self.crawler.field_quota.set_target(target_count)
+        if not self.frontier.queues:
+            self.seed_all_sources(target_count)
+
+        if self.use_processes:
+            # spawn: the parent is multithreaded by the time workers start
+            executor = ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            executor = ThreadPoolExecutor(self.parse_workers)
+
+        fetchers = [threading.Thread(target=self.fetch_worker, daemon=True) for _ in range(self.fetch_workers)]
+        dispatcher = threading.Thread(target=self.parse_dispatcher, args=(executor,), daemon=True)
+        writer = threading.Thread(target=self.writer, daemon=True)
+        for thread in fetchers + [dispatcher, writer]:
+            thread.start()
+
+        try:
+            # Fetchers exit only when nothing is queued or in flight, which
+            # includes pages still being parsed and their links
+            while any(thread.is_alive() for thread in fetchers):
+                next(thread for thread in fetchers if thread.is_alive()).join(progress_interval)
+                if progress:
+                    progress(self.get_stats())
+            self.fetchers_done.set()
+            dispatcher.join()
+            writer.join()
+        finally:
+            self.stop.set()
+            self.fetchers_done.set()
+            executor.shutdown(cancel_futures=True)
+
+        stats = self.get_stats()
+        logger.info(f"Pipeline finished: {stats}")
+        return stats
+
+    def get_stats(self):
+        latencies = sorted(self.fetch_to_store)
+        fetched = self.stats['fetch'].processed - self.stats['fetch'].errors
+        return {
+            'saved': self.saved,
+            'extracted': self.extracted,
+            'failed': self.failed,
+            'items_per_page': round(self.saved / fetched, 2) if fetched else None,
+            'fetch': self.stats['fetch'].get_stats(self.frontier.pending()),
+            'parse': self.stats['parse'].get_stats(self.parse_queue.qsize()),
+            'store': self.stats['store'].get_stats(self.store_queue.qsize()),
+            'fetch_to_store_p50_s': round(latencies[len(latencies) // 2], 2) if latencies else None,
+            'fetch_to_store_max_s': round(latencies[-1], 2) if latencies else None,
+            'fields': self.crawler.field_quota.get_stats()
+        }
@@ -0,0 +1,125 @@
+"""
+Opt-in SQL profiling: per-request query counts, DB time, slow and repeated statements
+"""
+
+import os
+import time
+import logging
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+# The same statement this many times in one request is reported as an N+1 pattern
+REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', 5))
+SLOWEST_KEPT = 3
+MAX_PARAMS_CHARS = 300
+MAX_STATEMENT_CHARS = 500
+
+
+def short_statement(statement):
+    text = ' '.join(statement.split())
+    return text if len(text) <= MAX_STATEMENT_CHARS else text[:MAX_STATEMENT_CHARS] + '...'
+
+
+def short_params(parameters):
+    text = repr(parameters)
+    return text if len(text) <= MAX_PARAMS_CHARS else text[:MAX_PARAMS_CHARS] + '...'
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own context: a failed statement never reaches after_cursor_execute
+    context._query_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    if not has_request_context():
+        return
+    queries = g.setdefault('sql_queries', [])
+    queries.append((statement, parameters, elapsed))
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(f"Slow query ({elapsed * 1000:.1f} ms) on {request.path}: {short_statement(statement)} {short_params(parameters)}")
+
+
+def install_engine_profiling(engine):
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+def add_profiling_headers(response):
+    """Attach Server-Timing/X-Query-Count and log repeated statements"""
+    queries = g.get('sql_queries', [])
+    db_ms = sum(elapsed for _, _, elapsed in queries) * 1000
+    timings = [f'db;dur={db_ms:.1f};desc="{len(queries)} queries"']
+    if 'request_start' in g:
+        timings.append(f"app;dur={(time.perf_counter() - g.request_start) * 1000:.1f}")
+    response.headers['Server-Timing'] = ', '.join(timings)
+    response.headers['X-Query-Count'] = str(len(queries))
+
+    repeated = [(statement, count) for statement, count in Counter(q[0] for q in queries).items()
+                if count >= REPEAT_THRESHOLD]
+    for statement, count in repeated:
+        logger.warning(f"Statement ran {count} times on {request.path} (possible N+1): {short_statement(statement)}")
+
+    if queries:
+        slowest = sorted(queries, key=lambda query: query[2], reverse=True)[:SLOWEST_KEPT]
+        logger.info(f"{request.method} {request.path}: {len(queries)} queries, {db_ms:.1f} ms in DB; slowest: " +
+                    '; '.join(f"{elapsed * 1000:.1f} ms {short_statement(statement)} {short_params(parameters)}"
+                              for statement, parameters, elapsed in slowest))
+    return response
+
+
+def init_profiler(app, db):
+    """Hook engine and request events when SQL_PROFILING is enabled"""
+    if not app.config.get('SQL_PROFILING'):
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            install_engine_profiling(engine)
+    app.before_request(start_request_timer)
+    app.after_request(add_profiling_headers)
+    logger.info(f"SQL profiling enabled (slow query threshold {SLOW_QUERY_MS:.0f} ms)")
+
+
+@contextmanager
+def query_budget(db, max_queries):
+    """Fail when the block runs more than max_queries statements, listing what ran
+
+        with app.app_context(), query_budget(db, 2):
+            client.get('/all-data')
+    """
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'after_cursor_execute', count)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, 'after_cursor_execute', count)
+
+    if len(statements) > max_queries:
+        listing = '\n'.join(f"  {index + 1}. {short_statement(statement)}" for index, statement in enumerate(statements))
+        raise AssertionError(f"{len(statements)} queries, budget was {max_queries}:\n{listing}")
+
+
+def assert_route_budget(client, path, max_queries):
+    """Request path through a test client of a profiling-enabled app and check X-Query-Count"""
+    response = client.get(path)
+    used = int(response.headers['X-Query-Count'])
+    if used > max_queries:
+        raise AssertionError(f"{path} ran {used} queries, budget was {max_queries}")
+    return response
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Re-run field classification over stored AcademicContent rows in bulk"""
+
+import json
+import random
+import argparse
+from collections import Counter
+
+from app import create_app, db
+from models import AcademicContent
+from db_utils import ensure_schema
+from classifier import FieldClassifier, DEFAULT_FIELD
+from analytics import rebuild_rollups
+
+
+def row_text(title, summary, verified_facts):
+    facts = json.loads(verified_facts) if verified_facts else []
+    return ' '.join([title or '', summary or ''] + facts)
+
+
+def iter_chunks(chunk_size):
+    """Keyset pagination by id, so each chunk is an index range scan"""
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(AcademicContent.id, AcademicContent.title, AcademicContent.summary,
+                      AcademicContent.verified_facts, AcademicContent.source_url, AcademicContent.field)
+            .where(AcademicContent.id > last_id)
+            .order_by(AcademicContent.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield rows
+
+
+def sample_labelled(sample_size):
+    """Random labelled rows to fit centroids on; the fallback field carries no signal"""
+    max_id = db.session.query(db.func.max(AcademicContent.id)).scalar() or 0
+    ids = random.Random(0).sample(range(1, max_id + 1), min(sample_size, max_id))
+    texts = []
+    labels = []
+    for start in range(0, len(ids), 1000):
+        rows = db.session.execute(
+            db.select(AcademicContent.title, AcademicContent.summary, AcademicContent.verified_facts, AcademicContent.field)
+            .where(AcademicContent.id.in_(ids[start:start + 1000]), AcademicContent.field != DEFAULT_FIELD)
+        ).all()
+        for row in rows:
+            texts.append(row_text(row.title, row.summary, row.verified_facts))
+            labels.append(row.field)
+    return texts, labels
+
+
+def reclassify(classifier, chunk_size=2000, dry_run=False):
+    """Write new fields in chunks, then refresh everything derived from field"""
+    changes = Counter()
+    scanned = 0
+    for rows in iter_chunks(chunk_size):
+        fields = classifier.classify_batch(
+            [row_text(row.title, row.summary, row.verified_facts) for row in rows],
+            [row.source_url for row in rows]
+        )
+        updates = [{'id': row.id, 'field': field} for row, field in zip(rows, fields) if field != row.field]
+        for row, field in zip(rows, fields):
+            if field != row.field:
+                changes[(row.field, field)] += 1
+        if updates and not dry_run:
+            db.session.execute(db.update(AcademicContent), updates)
+            db.session.commit()
+        scanned += len(rows)
+        print(f"Scanned {scanned} rows, {sum(changes.values())} changed")
+    
+    if changes and not dry_run:
+        # The bulk UPDATE bypasses the ingest hooks, so the rollups are rebuilt here. The web
+        # workers' caches live in other processes: facets expire after FACET_TTL, and cards
+        # are keyed on field, so reclassified rows render again
+        rebuild_rollups()
+    return scanned, changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--sample-size', type=int, default=20000, help='labelled rows used to fit the centroids')
+    parser.add_argument('--keywords-only', action='store_true', help='build centroids from FIELD_KEYWORDS alone')
+    parser.add_argument('--dry-run', action='store_true', help='report changes without writing them')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        classifier = FieldClassifier()
+        if not args.keywords_only:
+            texts, labels = sample_labelled(args.sample_size)
+            classifier.fit(texts, labels)
+
+        scanned, changes = reclassify(classifier, args.chunk_size, args.dry_run)
+        print(f"Done: {scanned} rows scanned, {sum(changes.values())} {'would change' if args.dry_run else 'changed'}")
+        for (old, new), count in changes.most_common(10):
+            print(f"  {old} -> {new}: {count}")
@@ -0,0 +1,65 @@
+"""
+Compact in-memory record for items moving through the crawl pipeline
+"""
+
+import sys
+
+
+class AcademicRecord:
+    """One extracted academic item
+
+    Uses __slots__ instead of a per-item dict, stores people and facts as
+    tuples and interns the small set of repeated strings (type, field, date,
+    location). Supports read-only mapping access (record['title'],
+    record.get('date')) so code written against the old dicts keeps working.
+    """
+
+    __slots__ = ('type', 'title', 'field', 'date', 'location', 'key_people',
+                 'summary', 'verified_facts', 'source_url', 'content_hash', 'body_hash')
+
+    def __init__(self, type, title, field, date='', location='', key_people=(),
+                 summary='', verified_facts=(), source_url='', content_hash=None,
+                 body_hash=None):
+        self.type = sys.intern(type)
+        self.title = title
+        self.field = sys.intern(field)
+        self.date = sys.intern(date or '')
+        self.location = sys.intern(location or '')
+        self.key_people = tuple(key_people or ())
+        self.summary = summary
+        self.verified_facts = tuple(verified_facts or ())
+        self.source_url = source_url or ''
+        self.content_hash = content_hash
+        self.body_hash = body_hash
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in self.__slots__}
+        data['key_people'] = list(self.key_people)
+        data['verified_facts'] = list(self.verified_facts)
+        return data
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self.__slots__:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __eq__(self, other):
+        if not isinstance(other, AcademicRecord):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    def __repr__(self):
+        return f"AcademicRecord(title={self.title!r}, field={self.field!r}, type={self.type!r})"
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Replay archived WARC responses through the current extraction code and upsert the results"""
+
+import os
+import time
+import logging
+import argparse
+from collections import deque, Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from app import create_app, db
+from db_utils import ensure_schema
+from data_processor import DataProcessor
+from downloader import HTML_CONTENT_TYPES, parse_content_type
+from warc import WARC_DIR, DEFAULT_WARC_DIR, WARC_SUFFIX, archive_files, iter_responses
+
+logger = logging.getLogger(__name__)
+
+TASK_PAGES = 25  # Pages per worker task; large enough to amortize pickling, small enough to balance
+
+_worker_crawler = None
+
+
+def extract_pages(pages):
+    """Worker process: decode and extract a list of (url, content type, body) pages"""
+    global _worker_crawler
+    if _worker_crawler is None:
+        from crawler import AcademicCrawler
+        _worker_crawler = AcademicCrawler()
+
+    records = []
+    errors = 0
+    for url, content_type, body in pages:
+        try:
+            _, charset = parse_content_type(content_type)
+            html = _worker_crawler.downloader.decode(body, charset)
+            content_data = _worker_crawler.parse_html(url, html)
+            record = _worker_crawler.extract_structured_data(content_data) if content_data else None
+        except Exception as e:
+            logger.error(f"Error extracting {url}: {e}")
+            errors += 1
+            continue
+        if record:
+            records.append(record)
+    return records, errors
+
+
+def iter_tasks(files, stats):
+    """Batches of archived HTML pages, in archive order"""
+    pages = []
+    for path in files:
+        for url, status, headers, body in iter_responses(path):
+            stats['responses'] += 1
+            mime_type, _ = parse_content_type(headers.get('content-type'))
+            if status != 200 or (mime_type and mime_type not in HTML_CONTENT_TYPES):
+                stats['skipped'] += 1
+                continue
+            pages.append((url, headers.get('content-type'), body))
+            if len(pages) >= TASK_PAGES:
+                yield pages
+                pages = []
+        stats['files'] += 1
+    if pages:
+        yield pages
+
+
+def reextract(files, workers=None, batch_size=500, dry_run=False):
+    """Extract archived pages in a process pool; the parent only reads the archive and writes rows
+
+    Results are consumed in submission order, so when a URL was archived
+    more than once its latest fetch is applied last.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = Counter()
+    processor = DataProcessor()
+    pending = deque()
+    batch = []
+    start = time.monotonic()
+
+    def flush():
+        if dry_run or not batch:
+            batch.clear()
+            return
+        try:
+            updated, inserted = processor.upsert_by_source_url(batch)
+            stats['updated'] += updated
+            stats['inserted'] += inserted
+        except Exception as e:
+            logger.error(f"Error saving batch of {len(batch)}: {e}")
+            db.session.rollback()
+            stats['failed'] += len(batch)
+        batch.clear()
+
+    def collect():
+        records, errors = pending.popleft().result()
+        stats['extracted'] += len(records)
+        stats['errors'] += errors
+        batch.extend(records)
+        if len(batch) >= batch_size:
+            flush()
+            print(f"{stats['responses']} responses read, {stats['extracted']} extracted, "
+                  f"{stats['updated']} updated, {stats['inserted']} inserted "
+                  f"({stats['responses'] / (time.monotonic() - start):.0f} pages/s)")
+
+    with ProcessPoolExecutor(workers) as executor:
+        for pages in iter_tasks(files, stats):
+            pending.append(executor.submit(extract_pages, pages))
+            # Bounded read-ahead keeps archive bodies from piling up in memory
+            if len(pending) >= workers * 2:
+                collect()
+        while pending:
+            collect()
+    flush()
+    stats['skipped_duplicates'] = processor.skipped['content_hash']
+    stats['seconds'] = round(time.monotonic() - start, 1)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('paths', nargs='*', default=[WARC_DIR or DEFAULT_WARC_DIR],
+                        help='.warc.gz files or directories (default: WARC_DIR, or warc/)')
+    parser.add_argument('--workers', type=int, default=None, help='extraction processes (default: CPU count)')
+    parser.add_argument('--batch-size', type=int, default=500, help='records per upsert commit')
+    parser.add_argument('--dry-run', action='store_true', help='extract without writing to the database')
+    args = parser.parse_args()
+
+    files = archive_files(args.paths)
+    if not files:
+        parser.error(f"No {WARC_SUFFIX} files found in {', '.join(args.paths)}")
+
+    app = create_app()
+    with app.app_context():
+        ensure_schema()
+        stats = reextract(files, args.workers, args.batch_size, args.dry_run)
+        print(f"Done: {dict(stats)}")
@@ -1,12 +1,23 @@
-from flask import render_template, jsonify, request
-from app import app
-from crawler import AcademicCrawler
+from flask import Blueprint, current_app, render_template, jsonify, request, url_for
 from data_processor import DataProcessor
+from facets import facet_cache, search_clause
+from fragments import card_cache
+from suggest import get_suggestions
+from storage import read_only
 import threading
 import logging
+import json
+import itertools
 
 logger = logging.getLogger(__name__)
 
+bp = Blueprint('main', __name__)
+
+# Rows serialized per chunk of the streamed /download_json body
+DOWNLOAD_CHUNK_ROWS = 500
+# Largest page the data APIs return for a ?limit= request
+MAX_API_LIMIT = 5000
+
 # Global variables for crawling status
 crawling_status = {
     'is_running': False,
@@ -15,7 +26,22 @@ crawling_status = {
     'total_extracted': 0
 }
 
-@app.route('/')
+# Crawler of the running crawl, used to report live per-host limits
+active_crawler = None
+
+@bp.app_template_filter('tojsonpretty')
+def to_json_pretty(value):
+    return json.dumps(value, ensure_ascii=False, indent=2)
+
+@bp.app_template_filter('number_format')
+def number_format(value):
+    """Format numbers with thousands separator"""
+    if isinstance(value, (int, float)):
+        return "{:,}".format(value)
+    return value
+
+@bp.route('/')
+@read_only
 def index():
     """Main page with Arabic interface"""
     data_processor = DataProcessor()
@@ -27,7 +53,7 @@ def index():
                          sample_data=sample_data,
                          crawling_status=crawling_status)
 
-@app.route('/start_crawling', methods=['POST'])
+@bp.route('/start_crawling', methods=['POST'])
 def start_crawling():
     """Start the crawling process"""
     global crawling_status
@@ -36,9 +62,17 @@ def start_crawling():
         return jsonify({'error': 'الزحف قيد التشغيل بالفعل'}), 400
     
     target_count = request.json.get('target_count', 290000)
+    app = current_app._get_current_object()
     
     def crawl_background():
-        global crawling_status
+        global crawling_status, active_crawler
+        # The crawler pulls in requests, BeautifulSoup and trafilatura, so it is
+        # only imported when a crawl actually starts
+        from crawler import AcademicCrawler
+        from pipeline import CrawlPipeline
+        from warc import open_archive
+        
+        archive = open_archive()
         try:
             crawling_status = {
                 'is_running': True,
@@ -47,31 +81,35 @@ def start_crawling():
                 'total_extracted': 0
             }
             
-            crawler = AcademicCrawler()
-            data_processor = DataProcessor()
+            crawler = AcademicCrawler(archive=archive)
+            active_crawler = crawler
             
             crawling_status['message'] = 'جاري استخراج البيانات من المصادر الأكاديمية...'
-            crawling_status['progress'] = 10
-            
-            # Start crawling
-            crawled_data = crawler.crawl_all_sources(target_count)
             
-            crawling_status['message'] = 'جاري حفظ البيانات في قاعدة البيانات...'
-            crawling_status['progress'] = 80
+            # Items are saved in batches as they are extracted, so progress is what is in the database
+            def report_progress(stats):
+                crawling_status['progress'] = min(99, int(stats['saved'] * 100 / target_count))
+                crawling_status['total_extracted'] = stats['saved']
+                crawling_status['pipeline'] = stats
             
-            # Save to database
-            saved_count, errors = data_processor.save_to_database(crawled_data)
+            pipeline = CrawlPipeline(crawler, app)
+            stats = pipeline.run(target_count, progress=report_progress)
+            saved_count = stats['saved']
+            with app.app_context():
+                DataProcessor().update_crawl_status("multiple", saved_count, "completed")
             
             crawling_status = {
                 'is_running': False,
                 'progress': 100,
                 'message': f'تم بنجاح! تم استخراج وحفظ {saved_count} عنصر',
-                'total_extracted': saved_count
+                'total_extracted': saved_count,
+                'pipeline': stats,
+                'url_filter_stats': crawler.url_filter.get_stats(),
+                'host_limits': crawler.throttle.get_stats(),
+                'download_stats': crawler.downloader.get_stats(),
+                'archive_stats': archive.get_stats() if archive else None
             }
             
-            if errors:
-                logger.warning(f"Crawling completed with {len(errors)} errors")
-            
         except Exception as e:
             logger.error(f"Crawling error: {e}")
             crawling_status = {
@@ -80,6 +118,10 @@ def start_crawling():
                 'message': f'خطأ في عملية الزحف: {str(e)}',
                 'total_extracted': 0
             }
+        finally:
+            active_crawler = None
+            if archive:
+                archive.close()
     
     # Start crawling in background thread
     thread = threading.Thread(target=crawl_background)
@@ -88,19 +130,81 @@ def start_crawling():
     
     return jsonify({'message': 'تم بدء عملية الزحف بنجاح'})
 
-@app.route('/crawling_status')
+@bp.route('/crawling_status')
 def get_crawling_status():
     """Get current crawling status"""
-    return jsonify(crawling_status)
+    status = dict(crawling_status)
+    crawler = active_crawler
+    if crawler is not None:
+        status['host_limits'] = crawler.throttle.get_stats()
+    return jsonify(status)
+
+def projection_args():
+    """(fields, limit, cursor) from ?fields=title,field&limit=100&cursor=..., ValueError if invalid"""
+    from models import AcademicContent
+    fields = None
+    requested = request.args.get('fields', '').strip()
+    if requested:
+        fields = list(dict.fromkeys(name.strip() for name in requested.split(',') if name.strip()))
+        allowed = AcademicContent.API_FIELDS + AcademicContent.EXTRA_API_FIELDS
+        unknown = [name for name in fields if name not in allowed]
+        if unknown:
+            raise ValueError(f"حقول غير معروفة: {', '.join(unknown)}. الحقول المتاحة: {', '.join(allowed)}")
+    
+    limit = request.args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError(f'limit يجب أن يكون عددا صحيحا: {limit}')
+        if limit < 1:
+            raise ValueError('limit يجب أن يكون عددا موجبا')
+        limit = min(limit, MAX_API_LIMIT)
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            cursor = int(cursor)
+        except ValueError:
+            raise ValueError(f'cursor غير صالح: {cursor}')
+    return fields, limit, cursor
 
-@app.route('/api/data')
+def projected_response(field_filter=None):
+    """JSON list of the projected rows; the next page's cursor goes in X-Next-Cursor and Link"""
+    try:
+        fields, limit, cursor = projection_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    items, next_cursor = DataProcessor().get_projected_data(fields, field_filter, limit, cursor)
+    response = jsonify(items)
+    if next_cursor is not None:
+        # Query parameters named like a path parameter (?field= on /api/data/field/<field>) would clash in url_for
+        view_args = request.view_args or {}
+        args = {name: value for name, value in request.args.items() if name not in view_args}
+        args['cursor'] = next_cursor
+        args['limit'] = limit
+        next_url = url_for(request.endpoint, **view_args, **args)
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+    return response
+
+@bp.route('/api/data')
+@read_only
 def get_all_data():
-    """API endpoint to get all extracted data as JSON"""
-    data_processor = DataProcessor()
-    all_data = data_processor.get_all_data_as_json()
-    return jsonify(all_data)
+    """API endpoint to get all extracted data as JSON
+
+    Optional ?fields= (comma-separated) selects the returned keys, and
+    ?limit= with ?cursor= pages through the rows in id order. Database
+    errors still return an empty list, as this endpoint always has.
+    """
+    try:
+        return projected_response()
+    except Exception as e:
+        logger.error(f"Error retrieving data: {e}")
+        return jsonify([])
 
-@app.route('/api/data/sample')
+@bp.route('/api/data/sample')
+@read_only
 def get_sample_data():
     """API endpoint to get sample data"""
     limit = request.args.get('limit', 10, type=int)
@@ -108,31 +212,73 @@ def get_sample_data():
     sample_data = data_processor.export_sample_data(limit)
     return jsonify(sample_data)
 
-@app.route('/api/statistics')
+@bp.route('/api/statistics')
+@read_only
 def get_statistics():
     """API endpoint to get crawling statistics"""
     data_processor = DataProcessor()
     stats = data_processor.get_statistics()
     return jsonify(stats)
 
-@app.route('/api/data/field/<field>')
+@bp.route('/api/facets')
+@read_only
+def get_facets():
+    """Field and type counts for the current search and filters"""
+    facets = facet_cache.get_facets(
+        request.args.get('search', '').strip(),
+        request.args.get('field', '').strip(),
+        request.args.get('type', '').strip()
+    )
+    return jsonify(facets)
+
+@bp.route('/api/analytics/decades')
+@read_only
+def analytics_decades():
+    """Items per decade, for one ?field= or broken down by field"""
+    from analytics import decade_counts, decade_field_counts
+    field = request.args.get('field', '').strip()
+    return jsonify(decade_counts(field) if field else decade_field_counts())
+
+@bp.route('/api/analytics/<dimension>')
+@read_only
+def analytics_top(dimension):
+    """Most frequent locations or key people, optionally within one ?field="""
+    from analytics import top_values
+    dimensions = {'locations': 'location', 'people': 'person'}
+    if dimension not in dimensions:
+        return jsonify({'error': f"بُعد غير معروف: {dimension}. المتاح: decades, {', '.join(dimensions)}"}), 404
+    field = request.args.get('field', '').strip()
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify(top_values(dimensions[dimension], field, max(1, limit)))
+
+@bp.route('/api/cache_stats')
+def cache_stats():
+    """Hit rates of the in-process facet and card caches"""
+    return jsonify({'facets': facet_cache.get_stats(), 'cards': card_cache.get_stats()})
+
+@bp.route('/api/suggest')
+@read_only
+def suggest():
+    """Title and key-people completions for the search box"""
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify(get_suggestions(query, limit) if query else [])
+
+@bp.route('/api/data/field/<field>')
+@read_only
 def get_data_by_field(field):
-    """Get data filtered by scientific field"""
-    from models import AcademicContent
+    """Get data filtered by scientific field; takes the same fields/limit/cursor parameters as /api/data"""
     try:
-        filtered_data = AcademicContent.query.filter_by(field=field).all()
-        json_data = [item.to_dict() for item in filtered_data]
-        return jsonify(json_data)
+        return projected_response(field)
     except Exception as e:
         logger.error(f"Error filtering by field {field}: {e}")
         return jsonify({'error': 'خطأ في استرجاع البيانات'}), 500
 
-@app.route('/all-data')
+@bp.route('/all-data')
+@read_only
 def all_data():
     """Display all academic data with pagination and filters"""
     from models import AcademicContent
-    from app import db
-    import json
     
     try:
         # Get pagination parameters
@@ -144,16 +290,14 @@ def all_data():
         field_filter = request.args.get('field', '').strip()
         type_filter = request.args.get('type', '').strip()
         
-        # Build query
-        query = AcademicContent.query
+        # Only the card cache key columns; full rows are loaded for cache misses alone
+        query = AcademicContent.query.with_entities(
+            AcademicContent.id, AcademicContent.crawled_at, AcademicContent.field, AcademicContent.content_hash
+        )
         
         # Apply search filter (case insensitive)
         if search_query:
-            query = query.filter(
-                (AcademicContent.title.contains(search_query)) |
-                (AcademicContent.summary.contains(search_query)) |
-                (AcademicContent.field.contains(search_query))
-            )
+            query = query.filter(search_clause(search_query))
         
         # Apply field filter
         if field_filter:
@@ -166,73 +310,74 @@ def all_data():
         # Order by date (newest first) then by id
         query = query.order_by(AcademicContent.date.desc(), AcademicContent.id.desc())
         
+        # Filter counts and the result size come from the facet cache, so the
+        # page query skips its own COUNT
+        facets = facet_cache.get_facets(search_query, field_filter, type_filter)
+        
         # Paginate
         pagination = query.paginate(
             page=page, 
             per_page=per_page, 
-            error_out=False
+            error_out=False,
+            count=False
         )
+        pagination.total = facets['matching']
         
-        items = pagination.items
-        
-        # Process items for template
-        processed_items = []
-        for item in items:
-            processed_item = {
-                'id': item.id,
-                'type': item.type,
-                'title': item.title,
-                'field': item.field,
-                'date': item.date,
-                'location': item.location,
-                'summary': item.summary,
-                'source_url': item.source_url,
-                'crawled_at': item.crawled_at,
-                'key_people_list': json.loads(item.key_people) if item.key_people else [],
-                'verified_facts_list': json.loads(item.verified_facts) if item.verified_facts else []
-            }
-            processed_items.append(processed_item)
+        # Cards are rendered once per row version and reused across page views
+        cards = card_cache.cards_for(pagination.items)
         
-        # Get unique fields and types for filters
-        fields = db.session.query(AcademicContent.field.distinct()).all()
-        fields = [field[0] for field in fields]
-        
-        types = db.session.query(AcademicContent.type.distinct()).all()
-        types = [type_[0] for type_ in types]
-        
-        # Get total count
-        total_count = AcademicContent.query.count()
+        # Total over the whole corpus, from the cached unfiltered counts
+        total_count = facet_cache.get_facets()['total']
         
         return render_template('all_data.html',
-                             items=processed_items,
+                             cards=cards,
                              pagination=pagination,
-                             fields=sorted(fields),
-                             types=sorted(types),
+                             fields=list(facets['fields']),
+                             types=list(facets['types']),
+                             facets=facets,
                              total_count=total_count)
         
     except Exception as e:
         logger.error(f"Error in all_data route: {str(e)}")
         return render_template('all_data.html',
-                             items=[],
+                             cards=[],
                              pagination=None,
                              fields=[],
                              types=[],
+                             facets=None,
                              total_count=0,
                              error=str(e))
 
-@app.route('/download_json')
+@bp.route('/download_json')
+@read_only
 def download_json():
-    """Download all data as JSON file"""
-    from flask import Response
-    import json
+    """Download all data as JSON file, streamed in chunks of rows, archived rows last"""
+    from flask import Response, stream_with_context
+    from models import AcademicContent
+    from cold_storage import iter_archived_rows, archived_dict
     
-    data_processor = DataProcessor()
-    all_data = data_processor.get_all_data_as_json()
+    # Compact by default; ?pretty=1 restores the indented layout
+    indent = 2 if request.args.get('pretty') else None
     
-    json_output = json.dumps(all_data, ensure_ascii=False, indent=2)
+    def generate():
+        yield '['
+        separator = ''
+        chunk = []
+        hot_items = (item.to_dict() for item in
+                     AcademicContent.query.order_by(AcademicContent.id).yield_per(DOWNLOAD_CHUNK_ROWS))
+        archived_items = (archived_dict(row) for row in iter_archived_rows())
+        for item in itertools.chain(hot_items, archived_items):
+            chunk.append(json.dumps(item, ensure_ascii=False, indent=indent))
+            if len(chunk) >= DOWNLOAD_CHUNK_ROWS:
+                yield separator + ','.join(chunk)
+                separator = ','
+                chunk = []
+        if chunk:
+            yield separator + ','.join(chunk)
+        yield ']'
     
     return Response(
-        json_output,
+        stream_with_context(generate()),
         mimetype='application/json',
         headers={'Content-Disposition': 'attachment; filename=academic_data.json'}
     )
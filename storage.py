@@ -0,0 +1,106 @@
+"""
+Database storage profiles: engine options, SQLite pragmas and read-replica routing
+"""
+
+import os
+import sqlite3
+import logging
+from functools import wraps
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+
+# Applied to every new SQLite connection. WAL lets readers proceed while a
+# long save_to_database transaction is writing; NORMAL sync is safe with WAL.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),  # Negative means KiB
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+    'temp_store': 'MEMORY'
+}
+
+
+def backend_name(database_url):
+    return database_url.split(':', 1)[0].split('+', 1)[0]
+
+
+def engine_options(database_url):
+    """SQLAlchemy engine options for the backend behind database_url"""
+    options = {
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+    }
+
+    if backend_name(database_url) in ('postgresql', 'postgres'):
+        # One connection per request thread in this worker, plus headroom for
+        # background crawls; gunicorn forks separate pools per worker.
+        threads = int(os.environ.get('DB_WORKER_THREADS', os.environ.get('GUNICORN_THREADS', 4)))
+        options['pool_size'] = int(os.environ.get('DB_POOL_SIZE', threads + 1))
+        options['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW', max(2, threads // 2)))
+        options['pool_timeout'] = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+
+    return options
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=None):
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def install_sqlite_pragmas(engine, pragmas=None):
+    """Run the pragmas on each new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+
+def configure_storage(app):
+    """Set engine options and the optional replica bind before db.init_app"""
+    database_url = app.config['SQLALCHEMY_DATABASE_URI']
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
+
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})
+        app.config['SQLALCHEMY_BINDS'][REPLICA_BIND] = {'url': replica_url, **engine_options(replica_url)}
+
+
+def init_storage(app, db):
+    """Install per-connection hooks once the engines exist"""
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine)
+
+
+class RoutingSession(Session):
+    """Sends reads from read-only views to the replica engine when one is configured"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('read_only'):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Mark a view as read-only so its queries may use the replica"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,287 @@
+"""
+In-memory prefix index over titles and key people for search-as-you-type
+"""
+
+import re
+import time
+import json
+import heapq
+import bisect
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+
+from fingerprint import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Arabic harakat, superscript alef and tatweel carry no meaning for matching
+ARABIC_MARKS_PATTERN = re.compile('[\u064B-\u065F\u0670\u0640]')
+ARABIC_LETTER_MAP = str.maketrans({
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627', '\u0671': '\u0627',  # Alef forms
+    '\u0649': '\u064A',  # Alef maksura -> yeh
+    '\u0629': '\u0647',  # Teh marbuta -> heh
+    '\u0624': '\u0648', '\u0626': '\u064A'  # Hamza carriers
+})
+WORD_START_PATTERN = re.compile(r'(?:^|\s)(?=\S)')
+
+MAX_RESULTS = 20
+MAX_WORD_STARTS = 8       # Words of a title that can start a match
+PRECOMPUTED_PREFIX = 2    # Prefixes up to this length get their top results at build time
+DELTA_LIMIT = 2000        # Entries added since the last build before the index is re-sorted
+CACHE_ENTRIES = 4096      # Cached top results for longer prefixes
+REBUILD_INTERVAL = 900    # Seconds before a full reload picks up writes from other processes
+
+KINDS = ('title', 'person')
+# Encodes (entry, offset) positions in one integer
+OFFSET_BITS = 8
+
+
+def normalize_search_text(text):
+    """normalize_text plus Arabic letter folding, so 'أينشتاين' matches 'اينشتاين'"""
+    text = normalize_text(text)
+    return ARABIC_MARKS_PATTERN.sub('', text).translate(ARABIC_LETTER_MAP)
+
+
+class SuggestIndex:
+    """Sorted word-start positions over normalized suggestion texts
+
+    Each distinct title or person is one entry with a popularity (rows that
+    carry it) and a recency (latest crawl time). Positions are sorted by the
+    text from that word onward, so a prefix query is two bisects. Top results
+    for short prefixes are computed at build time and for longer prefixes on
+    first use; entries added since the build live in a small sorted delta
+    that is merged into every lookup.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.built_at = None
+        self.rebuilding = False
+        self.reset()
+        self.stats = {'lookups': 0, 'cache_hits': 0, 'builds': 0, 'added': 0}
+
+    def reset(self):
+        self.texts = []
+        self.normalized = []
+        self.kinds = array('b')
+        self.counts = array('l')
+        self.latest = array('d')
+        self.entry_ids = {}
+        self.positions = array('q')
+        self.indexed = 0          # Entries below this id have their word starts in positions
+        self.delta = []
+        self.delta_entries = set()
+        self.top = {}
+        self.cache = OrderedDict()
+
+    def add_entry(self, kind, text, crawled_at):
+        """Record one occurrence of a title or person; returns its entry id"""
+        normalized = normalize_search_text(text)
+        if not normalized:
+            return None
+        key = (kind, normalized)
+        entry = self.entry_ids.get(key)
+        if entry is None:
+            entry = len(self.texts)
+            self.entry_ids[key] = entry
+            self.texts.append(text.strip())
+            self.normalized.append(normalized)
+            self.kinds.append(KINDS.index(kind))
+            self.counts.append(1)
+            self.latest.append(crawled_at)
+        else:
+            self.counts[entry] += 1
+            self.latest[entry] = max(self.latest[entry], crawled_at)
+        return entry
+
+    def add_row(self, title, key_people, crawled_at):
+        entries = [self.add_entry('title', title, crawled_at)]
+        for person in key_people or ():
+            entries.append(self.add_entry('person', person, crawled_at))
+        return [entry for entry in entries if entry is not None]
+
+    def word_starts(self, entry):
+        return [match.end() for match in WORD_START_PATTERN.finditer(self.normalized[entry])][:MAX_WORD_STARTS]
+
+    def suffix(self, position):
+        return self.normalized[position >> OFFSET_BITS][position & ((1 << OFFSET_BITS) - 1):]
+
+    def score(self, entry):
+        return (self.counts[entry], self.latest[entry])
+
+    def sort_positions(self):
+        """Sort every word start of every entry and precompute short-prefix results"""
+        positions = [
+            (entry << OFFSET_BITS) | offset
+            for entry in range(len(self.texts))
+            for offset in self.word_starts(entry)
+            if offset < (1 << OFFSET_BITS)
+        ]
+        positions.sort(key=self.suffix)
+        self.positions = array('q', positions)
+        self.indexed = len(self.texts)
+        self.delta = []
+        self.delta_entries = set()
+        self.cache.clear()
+
+        candidates = {}
+        for position in positions:
+            suffix = self.suffix(position)
+            for length in range(1, PRECOMPUTED_PREFIX + 1):
+                if len(suffix) >= length:
+                    candidates.setdefault(suffix[:length], set()).add(position >> OFFSET_BITS)
+        self.top = {prefix: heapq.nlargest(MAX_RESULTS, entries, key=self.score)
+                    for prefix, entries in candidates.items()}
+
+    def load(self, rows):
+        """Build from (title, key_people JSON, crawled_at) rows"""
+        with self.lock:
+            self.reset()
+            for title, key_people, crawled_at in rows:
+                people = json.loads(key_people) if key_people else []
+                self.add_row(title, people, crawled_at.timestamp() if crawled_at else 0.0)
+            self.sort_positions()
+            self.built_at = time.monotonic()
+            self.stats['builds'] += 1
+            logger.info(f"Suggest index built: {len(self.texts)} entries, {len(self.positions)} positions")
+
+    def add_rows(self, rows):
+        """Fold freshly ingested rows in without a full rebuild; no-op until first built"""
+        with self.lock:
+            if self.built_at is None:
+                return
+            now = time.time()
+            for row in rows:
+                people = row.get('key_people') or []
+                if isinstance(people, str):
+                    people = json.loads(people)
+                crawled_at = row.get('crawled_at')
+                for entry in self.add_row(row['title'], people, crawled_at.timestamp() if crawled_at else now):
+                    # Known entries only had their count and recency bumped; they are already searchable
+                    if entry < self.indexed or entry in self.delta_entries:
+                        continue
+                    self.delta_entries.add(entry)
+                    for offset in self.word_starts(entry):
+                        bisect.insort(self.delta, (self.normalized[entry][offset:], entry))
+                self.stats['added'] += 1
+            if len(self.delta) > DELTA_LIMIT:
+                self.sort_positions()
+
+    def main_matches(self, prefix):
+        """Top entries in the sorted positions whose suffix starts with prefix"""
+        if len(prefix) <= PRECOMPUTED_PREFIX:
+            return self.top.get(prefix, [])
+
+        cached = self.cache.get(prefix)
+        if cached is not None:
+            self.cache.move_to_end(prefix)
+            self.stats['cache_hits'] += 1
+            return cached
+
+        start = bisect.bisect_left(self.positions, prefix, key=self.suffix)
+        end = bisect.bisect_left(self.positions, prefix + '\uffff', lo=start, key=self.suffix)
+        entries = {self.positions[index] >> OFFSET_BITS for index in range(start, end)}
+        result = heapq.nlargest(MAX_RESULTS, entries, key=self.score)
+
+        self.cache[prefix] = result
+        if len(self.cache) > CACHE_ENTRIES:
+            self.cache.popitem(last=False)
+        return result
+
+    def suggest(self, query, limit=10):
+        prefix = normalize_search_text(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_RESULTS))
+
+        with self.lock:
+            self.stats['lookups'] += 1
+            entries = set(self.main_matches(prefix))
+            start = bisect.bisect_left(self.delta, (prefix,))
+            for suffix, entry in self.delta[start:]:
+                if not suffix.startswith(prefix):
+                    break
+                entries.add(entry)
+            # A title and a person can share a text; only the better-ranked one is shown
+            ranked = []
+            shown = set()
+            for entry in heapq.nlargest(limit * 2, entries, key=self.score):
+                if self.normalized[entry] not in shown:
+                    shown.add(self.normalized[entry])
+                    ranked.append(entry)
+            ranked = ranked[:limit]
+            return [{
+                'text': self.texts[entry],
+                'kind': KINDS[self.kinds[entry]],
+                'count': self.counts[entry],
+                'latest': self.latest[entry]
+            } for entry in ranked]
+
+    def replace_with(self, fresh):
+        """Take over every piece of built state from fresh, an index loaded off the lock"""
+        with self.lock:
+            for name, value in vars(fresh).items():
+                if name not in ('lock', 'rebuilding', 'stats'):
+                    setattr(self, name, value)
+            self.stats['builds'] += 1
+
+    def is_stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > REBUILD_INTERVAL
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, entries=len(self.texts), positions=len(self.positions), delta=len(self.delta))
+
+
+suggest_index = SuggestIndex()
+
+
+def corpus_rows(chunk_size=5000):
+    """(title, key_people, crawled_at) of every row, read in keyset chunks by id"""
+    from app import db
+    from models import AcademicContent
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(AcademicContent.id, AcademicContent.title, AcademicContent.key_people,
+                      AcademicContent.crawled_at)
+            .where(AcademicContent.id > last_id)
+            .order_by(AcademicContent.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        for row in rows:
+            yield row.title, row.key_people, row.crawled_at
+
+
+def refresh_in_background(app):
+    """Reload the index from the database without blocking lookups on the old one"""
+    with suggest_index.lock:
+        if suggest_index.rebuilding:
+            return
+        suggest_index.rebuilding = True
+
+    def rebuild():
+        try:
+            fresh = SuggestIndex()
+            with app.app_context():
+                fresh.load(corpus_rows())
+            suggest_index.replace_with(fresh)
+        except Exception as e:
+            logger.error(f"Suggest index rebuild failed: {e}")
+        finally:
+            suggest_index.rebuilding = False
+
+    threading.Thread(target=rebuild, daemon=True).start()
+
+
+def get_suggestions(query, limit=10):
+    """Suggestions for query; the index is (re)built in the background, returning nothing until ready"""
+    if suggest_index.is_stale():
+        from flask import current_app
+        refresh_in_background(current_app._get_current_object())
+    return suggest_index.suggest(query, limit)
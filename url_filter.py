@@ -0,0 +1,139 @@
+"""
+URL canonicalization and pre-fetch filtering for the crawler
+"""
+
+import mimetypes
+import posixpath
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', 'igshid', 'ref', 'ref_src', 'spm'
+}
+TRACKING_PREFIXES = ('utm_',)
+
+# Extensions we never want to download, even when the MIME type is unknown
+SKIP_EXTENSIONS = {
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.zip', '.gz',
+    '.tar', '.rar', '.7z', '.exe', '.dmg', '.iso', '.csv', '.xml', '.json',
+    '.css', '.js', '.ico', '.svg', '.epub'
+}
+SKIP_MIME_PREFIXES = ('image/', 'audio/', 'video/', 'font/')
+HTML_EXTENSIONS = {'', '.html', '.htm', '.shtml', '.xhtml', '.php', '.asp', '.aspx', '.jsp', '.cfm'}
+
+# Path keywords for non-content pages (kept from the original crawler rules)
+SKIP_KEYWORDS = ['login', 'register', 'contact', 'privacy', 'terms']
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """Return a normalized form of url, or None if it is not an http(s) URL"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return None
+
+    host = (parts.hostname or '').rstrip('.')
+    if not host:
+        return None
+
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    path = parts.path or '/'
+    if '//' in path or '/.' in path:
+        trailing = path.endswith('/')
+        path = posixpath.normpath(path)
+        if trailing and path != '/':
+            path += '/'
+
+    query_pairs = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(query_pairs))
+
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def host_matches(host, domain):
+    """Exact host match: the domain itself or one of its subdomains"""
+    host = host.lower()
+    domain = domain.lower()
+    return host == domain or host.endswith('.' + domain)
+
+
+class UrlFilter:
+    """Decides which discovered links are worth fetching and counts the rejects"""
+
+    def __init__(self, skip_keywords=None):
+        self.skip_keywords = skip_keywords if skip_keywords is not None else SKIP_KEYWORDS
+        self.stats = {
+            'accepted': 0,
+            'bad_scheme': 0,
+            'off_host': 0,
+            'non_html': 0,
+            'skip_keyword': 0,
+            'duplicate': 0
+        }
+
+    def is_html_path(self, path):
+        """Guess from the path extension whether the URL points to an HTML page"""
+        extension = posixpath.splitext(path)[1].lower()
+        if extension in HTML_EXTENSIONS:
+            return True
+        if extension in SKIP_EXTENSIONS:
+            return False
+        mime_type, _ = mimetypes.guess_type(path)
+        if mime_type is None:
+            return True
+        if mime_type.startswith(SKIP_MIME_PREFIXES):
+            return False
+        return mime_type in ('text/html', 'application/xhtml+xml')
+
+    def check(self, url, domain_filter=None, *seen):
+        """Return the canonical URL if it should be fetched, otherwise None
+
+        seen are sets of canonical URLs already queued (e.g. crawl-wide and
+        this page's); each URL is counted under exactly one outcome.
+        """
+        canonical = canonicalize_url(url)
+        if canonical is None:
+            self.stats['bad_scheme'] += 1
+            return None
+
+        parts = urlsplit(canonical)
+        if domain_filter and not host_matches(parts.hostname or '', domain_filter):
+            self.stats['off_host'] += 1
+            return None
+
+        if not self.is_html_path(parts.path):
+            self.stats['non_html'] += 1
+            return None
+
+        path_lower = parts.path.lower()
+        if any(skip in path_lower for skip in self.skip_keywords):
+            self.stats['skip_keyword'] += 1
+            return None
+
+        if any(canonical in urls for urls in seen if urls is not None):
+            self.stats['duplicate'] += 1
+            return None
+
+        self.stats['accepted'] += 1
+        return canonical
+
+    def get_stats(self):
+        """Counters of accepted links and fetches saved per rule"""
+        stats = dict(self.stats)
+        stats['fetches_saved'] = sum(v for k, v in self.stats.items() if k != 'accepted')
+        return stats
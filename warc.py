@@ -0,0 +1,184 @@
+"""
+Raw response archive: gzip-per-record WARC files, rotated at a size cap, and a reader to replay them
+"""
+
+import os
+import gzip
+import uuid
+import base64
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+WARC_DIR = os.environ.get('WARC_DIR', '')  # Opt-in: archiving is off unless a directory is set
+DEFAULT_WARC_DIR = 'warc'  # Where reextract.py looks when WARC_DIR is unset
+WARC_MAX_BYTES = int(os.environ.get('WARC_MAX_BYTES', 256 * 1024 * 1024))
+WARC_VERSION = 'WARC/1.0'
+WARC_SUFFIX = '.warc.gz'
+GZIP_LEVEL = 6
+# The body is stored decoded, so these no longer describe it
+DROPPED_HTTP_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def warc_date():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def payload_digest(payload):
+    return 'sha1:' + base64.b32encode(hashlib.sha1(payload).digest()).decode('ascii')
+
+
+def build_record(warc_type, headers, block):
+    """Serialized WARC record: version line, named fields, block, two CRLFs"""
+    fields = [
+        ('WARC-Type', warc_type),
+        ('WARC-Record-ID', f'<urn:uuid:{uuid.uuid4()}>'),
+        ('WARC-Date', warc_date()),
+    ] + list(headers) + [('Content-Length', str(len(block)))]
+    head = WARC_VERSION + '\r\n' + ''.join(f'{name}: {value}\r\n' for name, value in fields) + '\r\n'
+    return head.encode('utf-8') + block + b'\r\n\r\n'
+
+
+def http_block(response, body):
+    """HTTP status line and headers as received, followed by the decoded body"""
+    reason = response.reason or ''
+    lines = [f'HTTP/1.1 {response.status_code} {reason}'.rstrip()]
+    for name, value in response.headers.items():
+        if name.lower() not in DROPPED_HTTP_HEADERS:
+            lines.append(f'{name}: {value}')
+    lines.append(f'Content-Length: {len(body)}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', 'replace') + body
+
+
+class WarcWriter:
+    """Thread-safe appender of response records to rotating .warc.gz files
+
+    Each record is its own gzip member, as standard WARC tools expect, so a
+    file cut short by a crash is still readable up to its last full record.
+    A new file is started once the current one reaches max_bytes; files are
+    only created when the first record arrives.
+    """
+
+    def __init__(self, directory=WARC_DIR or DEFAULT_WARC_DIR, max_bytes=WARC_MAX_BYTES, prefix='crawl'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.serial = 0
+        self.stats = {'records': 0, 'files': 0, 'bytes_written': 0}
+
+    def new_file(self):
+        if self.file:
+            self.file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')
+        self.serial += 1
+        self.path = os.path.join(self.directory, f'{self.prefix}-{stamp}-{os.getpid()}-{self.serial:05d}{WARC_SUFFIX}')
+        self.file = open(self.path, 'ab')
+        self.stats['files'] += 1
+        info = 'software: academic-crawler\r\nformat: WARC File Format 1.0\r\n'.encode('utf-8')
+        self.append(build_record('warcinfo', [('WARC-Filename', os.path.basename(self.path)),
+                                              ('Content-Type', 'application/warc-fields')], info))
+        logger.info(f"Writing WARC archive {self.path}")
+
+    def append(self, record):
+        data = gzip.compress(record, GZIP_LEVEL)
+        self.file.write(data)
+        self.stats['bytes_written'] += len(data)
+
+    def write_response(self, response, body):
+        """Archive a response whose body (bytes, content-decoded) has been read in full"""
+        block = http_block(response, body)
+        record = build_record('response', [
+            ('WARC-Target-URI', response.url),
+            ('WARC-Payload-Digest', payload_digest(body)),
+            ('Content-Type', 'application/http; msgtype=response'),
+        ], block)
+        # Compress outside the lock; only the append is serialized
+        data = gzip.compress(record, GZIP_LEVEL)
+        with self.lock:
+            if self.file is None or self.file.tell() >= self.max_bytes:
+                self.new_file()
+            self.file.write(data)
+            self.file.flush()
+            self.stats['records'] += 1
+            self.stats['bytes_written'] += len(data)
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, current_file=self.path)
+
+
+def open_archive():
+    """WarcWriter for WARC_DIR, or None when archiving is disabled"""
+    return WarcWriter() if WARC_DIR else None
+
+
+def parse_fields(lines):
+    headers = {}
+    for line in lines:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def iter_records(path):
+    """(WARC headers, block bytes) for every record in a .warc.gz file"""
+    with gzip.open(path, 'rb') as stream:
+        while True:
+            line = stream.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue  # Trailing CRLFs of the previous record
+            if not line.startswith(b'WARC/'):
+                raise ValueError(f"{path}: expected a WARC version line, got {line[:40]!r}")
+            lines = []
+            while True:
+                line = stream.readline()
+                if not line.strip():
+                    break
+                lines.append(line.decode('utf-8').rstrip('\r\n'))
+            headers = parse_fields(lines)
+            block = stream.read(int(headers.get('content-length', 0)))
+            yield headers, block
+
+
+def parse_http_block(block):
+    """(status code, {header: value} lowercased, body) of an application/http block"""
+    head, _, body = block.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    return status, parse_fields(lines[1:]), body
+
+
+def iter_responses(path):
+    """(url, status, http headers, body) for the response records of one file"""
+    for headers, block in iter_records(path):
+        if headers.get('warc-type') != 'response':
+            continue
+        status, http_headers, body = parse_http_block(block)
+        yield headers['warc-target-uri'], status, http_headers, body
+
+
+def archive_files(paths):
+    """.warc.gz files under the given files/directories, oldest first by name"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in os.listdir(path) if name.endswith(WARC_SUFFIX))
+        elif os.path.isfile(path):
+            files.append(path)
+    # Names carry the creation time, so later fetches of a URL are replayed last
+    return sorted(files, key=os.path.basename)